@@ -1,10 +1,17 @@
+import click
 from flask.cli import FlaskGroup
+from flask_migrate import stamp
 
 from project import create_app, db
 from project.models import (
     User,
-    Role
+    Role,
+    BlacklistToken,
+    Article,
+    rebuild_search_index
 )
+from project.api.catalog import source_catalog
+from project.api.summaries import summarize_articles, ENGINES
 
 app = create_app()
 cli = FlaskGroup(create_app=create_app)
@@ -17,6 +24,8 @@ def recreate_db():
     db.drop_all()
     db.create_all()
     db.session.commit()
+    # the tables match the latest migration
+    stamp()
 
 
 @cli.command()
@@ -25,6 +34,8 @@ def create_db():
     print("Creating database...")
     db.create_all()
     db.session.commit()
+    # the tables match the latest migration
+    stamp()
 
 
 @cli.command()
@@ -43,5 +54,53 @@ def seed_db():
     print("Database seeded!")
 
 
+@cli.command("rebuild-search-index")
+def rebuild_search():
+    """Creates the article full-text index if missing and re-indexes every article."""
+    print("Rebuilding search index...")
+    rebuild_search_index()
+
+    print("Search index rebuilt!")
+
+
+@cli.command("prune-blacklist")
+def prune_blacklist():
+    """Deletes revoked tokens that have expired."""
+    print("Pruning token blacklist...")
+    deleted = BlacklistToken.prune_expired()
+
+    print("Pruned {} expired tokens!".format(deleted))
+
+
+@cli.command("prune-articles")
+def prune_articles():
+    """Deletes articles that are in no user's feed anymore."""
+    print("Pruning articles...")
+    deleted = Article.prune_orphans()
+
+    print("Pruned {} articles!".format(deleted))
+
+
+@cli.command("refresh-sources")
+def refresh_sources():
+    """Refreshes the local news source catalog."""
+    print("Refreshing source catalog...")
+    source_catalog.refresh()
+
+    print("Source catalog refreshed!")
+
+
+@cli.command("summarize-articles")
+@click.option("--engine", default="auto", type=click.Choice(ENGINES))
+def summarize(engine):
+    """Writes the bullet points of every article not summarized yet."""
+    print("Summarizing articles...")
+
+    ids = [id for id, in db.session.query(Article.id)]
+    count = summarize_articles(ids, engine=engine)
+
+    print("Summarized {} articles!".format(count))
+
+
 if __name__ == "__main__":
     cli()
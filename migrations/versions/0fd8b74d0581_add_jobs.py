@@ -0,0 +1,39 @@
+"""add jobs
+
+Revision ID: 0fd8b74d0581
+Revises: a4dbd0321708
+Create Date: 2026-10-17 19:13:35.984721
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0fd8b74d0581'
+down_revision = 'a4dbd0321708'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('jobs',
+    sa.Column('kind', sa.String(length=64), nullable=False),
+    sa.Column('status', sa.Enum('QUEUED', 'RUNNING', 'FINISHED', 'FAILED', 'CANCELLED', name='jobstatus'), nullable=True),
+    sa.Column('progress', sa.Integer(), nullable=True),
+    sa.Column('total', sa.Integer(), nullable=True),
+    sa.Column('message', sa.Text(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('jobs')
+    sa.Enum(name='jobstatus').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,26 @@
+"""index blacklisted_on
+
+Revision ID: 1977f535eb01
+Revises: b180f9fb0b5b
+Create Date: 2026-10-17 19:17:39.829265
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1977f535eb01'
+down_revision = 'b180f9fb0b5b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('blacklist_tokens', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_blacklist_tokens_blacklisted_on'), ['blacklisted_on'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('blacklist_tokens', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_blacklist_tokens_blacklisted_on'))
@@ -0,0 +1,33 @@
+"""add article summaries
+
+Revision ID: 2f56cebc1adc
+Revises: f7fa93557798
+Create Date: 2026-10-17 19:18:29.877697
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f56cebc1adc'
+down_revision = 'f7fa93557798'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('article_summaries',
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('bullets', sa.Text(), nullable=False),
+    sa.Column('engine', sa.String(length=64), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash')
+    )
+
+
+def downgrade():
+    op.drop_table('article_summaries')
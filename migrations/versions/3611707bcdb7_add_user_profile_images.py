@@ -0,0 +1,26 @@
+"""add user profile images
+
+Revision ID: 3611707bcdb7
+Revises: 4717c61773c8
+Create Date: 2026-10-17 19:18:26.088820
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3611707bcdb7'
+down_revision = '4717c61773c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('profile_images', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('profile_images')
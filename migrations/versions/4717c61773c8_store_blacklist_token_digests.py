@@ -0,0 +1,75 @@
+"""store blacklist token digests
+
+Revision ID: 4717c61773c8
+Revises: 1977f535eb01
+Create Date: 2026-10-17 19:17:58.760270
+
+"""
+import hashlib
+from datetime import datetime
+
+import jwt
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4717c61773c8'
+down_revision = '1977f535eb01'
+branch_labels = None
+depends_on = None
+
+
+blacklist_tokens = sa.table(
+    'blacklist_tokens',
+    sa.column('id', sa.Integer),
+    sa.column('token', sa.String),
+    sa.column('digest', sa.String),
+    sa.column('expires_at', sa.DateTime),
+)
+
+
+def token_expiry(token):
+    # BlacklistToken.token_expiry as of this revision
+    try:
+        payload = jwt.decode(token, options={'verify_signature': False, 'verify_exp': False})
+        return datetime.utcfromtimestamp(payload['exp'])
+
+    except Exception:
+        return None
+
+
+def upgrade():
+    with op.batch_alter_table('blacklist_tokens', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('digest', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('expires_at', sa.DateTime(), nullable=True))
+
+    connection = op.get_bind()
+    for id, token in connection.execute(sa.select(blacklist_tokens.c.id, blacklist_tokens.c.token)).all():
+        connection.execute(blacklist_tokens.update().where(blacklist_tokens.c.id == id).values(
+            digest=hashlib.sha256(str(token).encode('utf-8')).hexdigest(),
+            expires_at=token_expiry(token)
+        ))
+
+    with op.batch_alter_table('blacklist_tokens', schema=None) as batch_op:
+        batch_op.alter_column('digest', existing_type=sa.String(length=64), nullable=False)
+        batch_op.create_unique_constraint('uq_blacklist_tokens_digest', ['digest'])
+        batch_op.create_index(batch_op.f('ix_blacklist_tokens_expires_at'), ['expires_at'], unique=False)
+        batch_op.drop_column('token')
+
+
+def downgrade():
+    # tokens cannot be recovered from their digests: the revocations are kept
+    # as rows, but no token matches them anymore
+    with op.batch_alter_table('blacklist_tokens', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token', sa.String(length=500), nullable=True))
+
+    op.execute(blacklist_tokens.update().values(token=blacklist_tokens.c.digest))
+
+    with op.batch_alter_table('blacklist_tokens', schema=None) as batch_op:
+        batch_op.alter_column('token', existing_type=sa.String(length=500), nullable=False)
+        batch_op.create_unique_constraint('uq_blacklist_tokens_token', ['token'])
+        batch_op.drop_index(batch_op.f('ix_blacklist_tokens_expires_at'))
+        batch_op.drop_constraint('uq_blacklist_tokens_digest', type_='unique')
+        batch_op.drop_column('expires_at')
+        batch_op.drop_column('digest')
@@ -0,0 +1,37 @@
+"""add source catalog
+
+Revision ID: 56316d424468
+Revises: 0fd8b74d0581
+Create Date: 2026-10-17 19:14:05.188744
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '56316d424468'
+down_revision = '0fd8b74d0581'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('source_catalog',
+    sa.Column('topic', sa.String(length=64), nullable=False),
+    sa.Column('name', sa.String(length=256), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('topic', 'name', name='uq_source_catalog_topic_name')
+    )
+    with op.batch_alter_table('source_catalog', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_source_catalog_topic'), ['topic'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('source_catalog', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_source_catalog_topic'))
+
+    op.drop_table('source_catalog')
@@ -0,0 +1,218 @@
+"""share articles between feeds
+
+Revision ID: 83a2b30e9d2f
+Revises: c017fb06dc43
+Create Date: 2026-10-17 19:15:03.437406
+
+"""
+import hashlib
+from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '83a2b30e9d2f'
+down_revision = 'c017fb06dc43'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+articles = sa.table(
+    'articles',
+    sa.column('id', sa.Integer),
+    sa.column('title', sa.String),
+    sa.column('source', sa.String),
+    sa.column('slug', sa.String),
+    sa.column('author', sa.String),
+    sa.column('date', sa.DateTime),
+    sa.column('summary', sa.Text),
+    sa.column('link', sa.String),
+    sa.column('image_url', sa.String),
+    sa.column('keywords', sa.Text),
+    sa.column('created_at', sa.DateTime),
+    sa.column('updated_at', sa.DateTime),
+    sa.column('user_id', sa.Integer),
+    sa.column('signature', sa.String),
+    sa.column('content_hash', sa.String),
+)
+
+user_articles = sa.table(
+    'user_articles',
+    sa.column('id', sa.Integer),
+    sa.column('date', sa.DateTime),
+    sa.column('user_id', sa.Integer),
+    sa.column('article_id', sa.Integer),
+    sa.column('created_at', sa.DateTime),
+    sa.column('updated_at', sa.DateTime),
+)
+
+user_article_signatures = sa.table(
+    'user_article_signatures',
+    sa.column('signature', sa.String),
+    sa.column('user_article_id', sa.Integer),
+    sa.column('created_at', sa.DateTime),
+    sa.column('updated_at', sa.DateTime),
+)
+
+
+def hash_link(link):
+    # Article.hash_link as of this revision
+    parts = urlsplit(link.strip())
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_')
+    ])
+    canonical = urlunsplit((
+        parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/'), query, ''
+    ))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def chunks(items):
+    for i in range(0, len(items), BATCH_SIZE):
+        yield items[i:i + BATCH_SIZE]
+
+
+def upgrade():
+    connection = op.get_bind()
+
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+    # one article per content hash (the latest copy), every user that had a
+    # copy gets a membership signed by the queries that fetched the copies
+    kept = {}
+    copies = []
+    for id, user_id, link, title, signature in connection.execute(sa.select(
+        articles.c.id, articles.c.user_id, articles.c.link, articles.c.title, articles.c.signature
+    ).order_by(articles.c.id)):
+        content_hash = hash_link(link or title)
+        kept[content_hash] = id
+        copies.append((content_hash, user_id, signature))
+
+    memberships = {}
+    for content_hash, user_id, signature in copies:
+        signatures = memberships.setdefault((user_id, kept[content_hash]), set())
+        if signature is not None:
+            signatures.add(signature)
+
+    kept_ids = set(kept.values())
+    dropped = [id for id, in connection.execute(sa.select(articles.c.id)) if id not in kept_ids]
+    for batch in chunks(dropped):
+        connection.execute(articles.delete().where(articles.c.id.in_(batch)))
+
+    for content_hash, id in kept.items():
+        connection.execute(
+            articles.update().where(articles.c.id == id).values(content_hash=content_hash))
+
+    dates = dict(connection.execute(sa.select(articles.c.id, articles.c.date)).all())
+
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.drop_index('ix_articles_user_signature_date')
+        batch_op.drop_constraint('uq_articles_user_link', type_='unique')
+        batch_op.alter_column('content_hash', existing_type=sa.String(length=64), nullable=False)
+        batch_op.create_unique_constraint('uq_articles_content_hash', ['content_hash'])
+        batch_op.drop_column('signature')
+        batch_op.drop_column('user_id')
+
+    op.create_table('user_articles',
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('article_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'article_id', name='uq_user_articles_user_article')
+    )
+    with op.batch_alter_table('user_articles', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_user_articles_article_id'), ['article_id'], unique=False)
+
+    op.create_table('user_article_signatures',
+    sa.Column('signature', sa.String(length=64), nullable=False),
+    sa.Column('user_article_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_article_id'], ['user_articles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_article_id', 'signature', name='uq_user_article_signatures_membership_signature')
+    )
+    with op.batch_alter_table('user_article_signatures', schema=None) as batch_op:
+        batch_op.create_index('ix_user_article_signatures_signature_membership', ['signature', 'user_article_id'], unique=False)
+
+    now = datetime.utcnow()
+    for batch in chunks(list(memberships)):
+        connection.execute(user_articles.insert(), [
+            {'user_id': user_id, 'article_id': article_id, 'date': dates[article_id],
+             'created_at': now, 'updated_at': now}
+            for user_id, article_id in batch
+        ])
+
+    ids = {
+        (user_id, article_id): id
+        for id, user_id, article_id in connection.execute(sa.select(
+            user_articles.c.id, user_articles.c.user_id, user_articles.c.article_id))
+    }
+    rows = [
+        {'user_article_id': ids[membership], 'signature': signature,
+         'created_at': now, 'updated_at': now}
+        for membership, signatures in memberships.items()
+        for signature in sorted(signatures)
+    ]
+    for batch in chunks(rows):
+        connection.execute(user_article_signatures.insert(), batch)
+
+
+def downgrade():
+    connection = op.get_bind()
+
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('signature', sa.String(length=64), nullable=True))
+        batch_op.drop_constraint('uq_articles_content_hash', type_='unique')
+        batch_op.alter_column('content_hash', existing_type=sa.String(length=64), nullable=True)
+
+    # the first member of each article owns it, the others get a copy;
+    # memberships keep one of their signatures
+    signatures = dict(connection.execute(sa.select(
+        user_article_signatures.c.user_article_id, sa.func.max(user_article_signatures.c.signature)
+    ).group_by(user_article_signatures.c.user_article_id)).all())
+
+    owned = set()
+    for id, user_id, article_id in connection.execute(sa.select(
+        user_articles.c.id, user_articles.c.user_id, user_articles.c.article_id
+    ).order_by(user_articles.c.id)).all():
+        signature = signatures.get(id)
+
+        if article_id not in owned:
+            owned.add(article_id)
+            connection.execute(articles.update().where(articles.c.id == article_id).values(
+                user_id=user_id, signature=signature))
+            continue
+
+        article = connection.execute(sa.select(
+            articles.c.title, articles.c.source, articles.c.slug, articles.c.author,
+            articles.c.date, articles.c.summary, articles.c.link, articles.c.image_url,
+            articles.c.keywords, articles.c.created_at, articles.c.updated_at
+        ).where(articles.c.id == article_id)).mappings().one()
+        connection.execute(articles.insert().values(
+            dict(article, user_id=user_id, signature=signature, content_hash=None)))
+
+    connection.execute(articles.delete().where(articles.c.user_id.is_(None)))
+
+    op.drop_table('user_article_signatures')
+    op.drop_table('user_articles')
+
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.drop_column('content_hash')
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_articles_user_id_users', 'users', ['user_id'], ['id'])
+        batch_op.create_unique_constraint('uq_articles_user_link', ['user_id', 'link'])
+        batch_op.create_index('ix_articles_user_signature_date', ['user_id', 'signature', 'date'], unique=False)
@@ -0,0 +1,79 @@
+"""add article search index
+
+Revision ID: af7238d99f6e
+Revises: b56b08275535
+Create Date: 2026-10-17 19:17:08.640339
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'af7238d99f6e'
+down_revision = 'b56b08275535'
+branch_labels = None
+depends_on = None
+
+
+# project.models.search DDL as of this revision
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5("
+    "title, summary, content='articles', content_rowid='id')",
+
+    "CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN "
+    "INSERT INTO articles_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary); "
+    "END",
+
+    "CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN "
+    "INSERT INTO articles_fts (articles_fts, rowid, title, summary) "
+    "VALUES ('delete', old.id, old.title, old.summary); "
+    "END",
+
+    "CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE OF title, summary ON articles BEGIN "
+    "INSERT INTO articles_fts (articles_fts, rowid, title, summary) "
+    "VALUES ('delete', old.id, old.title, old.summary); "
+    "INSERT INTO articles_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary); "
+    "END",
+
+    # index the articles already stored
+    "INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')",
+]
+
+POSTGRES_DDL = [
+    "ALTER TABLE articles ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(summary, '')), 'B')"
+    ") STORED",
+
+    "CREATE INDEX IF NOT EXISTS ix_articles_search_vector ON articles USING GIN (search_vector)",
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        statements = SQLITE_DDL
+    elif dialect == 'postgresql':
+        statements = POSTGRES_DDL
+    else:
+        # searched with LIKE
+        return
+
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        for trigger in ('articles_fts_insert', 'articles_fts_delete', 'articles_fts_update'):
+            op.execute('DROP TRIGGER IF EXISTS {}'.format(trigger))
+        op.execute('DROP TABLE IF EXISTS articles_fts')
+
+    elif dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_articles_search_vector')
+        op.execute('ALTER TABLE articles DROP COLUMN IF EXISTS search_vector')
@@ -0,0 +1,26 @@
+"""add user articles feed index
+
+Revision ID: b180f9fb0b5b
+Revises: af7238d99f6e
+Create Date: 2026-10-17 19:17:37.830782
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b180f9fb0b5b'
+down_revision = 'af7238d99f6e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_articles', schema=None) as batch_op:
+        batch_op.create_index('ix_user_articles_user_date_article', ['user_id', 'date', 'article_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_articles', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_articles_user_date_article')
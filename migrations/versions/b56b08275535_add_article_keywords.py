@@ -0,0 +1,124 @@
+"""add article keywords
+
+Revision ID: b56b08275535
+Revises: 83a2b30e9d2f
+Create Date: 2026-10-17 19:16:32.734564
+
+"""
+import ast
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b56b08275535'
+down_revision = '83a2b30e9d2f'
+branch_labels = None
+depends_on = None
+
+
+BATCH_SIZE = 500
+
+articles = sa.table(
+    'articles',
+    sa.column('id', sa.Integer),
+    sa.column('keywords', sa.Text),
+)
+
+article_keywords = sa.table(
+    'article_keywords',
+    sa.column('keyword', sa.String),
+    sa.column('normalized', sa.String),
+    sa.column('position', sa.Integer),
+    sa.column('article_id', sa.Integer),
+    sa.column('created_at', sa.DateTime),
+    sa.column('updated_at', sa.DateTime),
+)
+
+
+def keyword_rows(article_id, keywords, now):
+    # Article.set_keywords as of this revision
+    rows = []
+    seen = set()
+    for keyword in keywords:
+        keyword = str(keyword).strip()
+        if keyword and keyword.lower() not in seen:
+            seen.add(keyword.lower())
+            rows.append({
+                'keyword': keyword, 'normalized': keyword.lower(), 'position': len(rows),
+                'article_id': article_id, 'created_at': now, 'updated_at': now,
+            })
+
+    return rows
+
+
+def upgrade():
+    op.create_table('article_keywords',
+    sa.Column('keyword', sa.String(length=256), nullable=False),
+    sa.Column('normalized', sa.String(length=256), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=True),
+    sa.Column('article_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('article_id', 'normalized', name='uq_article_keywords_article_normalized')
+    )
+    with op.batch_alter_table('article_keywords', schema=None) as batch_op:
+        batch_op.create_index('ix_article_keywords_normalized_article', ['normalized', 'article_id'], unique=False)
+
+    # move the legacy stringified keyword lists to rows, in batches
+    connection = op.get_bind()
+    now = datetime.utcnow()
+
+    while True:
+        batch = connection.execute(sa.select(articles.c.id, articles.c.keywords).where(
+            articles.c.keywords.isnot(None)
+        ).limit(BATCH_SIZE)).all()
+
+        if not batch:
+            break
+
+        rows = []
+        for article_id, keywords in batch:
+            try:
+                keywords = ast.literal_eval(keywords)
+            except (ValueError, SyntaxError):
+                keywords = []
+
+            if isinstance(keywords, (list, tuple)):
+                rows.extend(keyword_rows(article_id, keywords, now))
+
+        if rows:
+            connection.execute(article_keywords.insert(), rows)
+        connection.execute(articles.update().where(
+            articles.c.id.in_([article_id for article_id, _ in batch])
+        ).values(keywords=None))
+
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.drop_column('keywords')
+
+
+def downgrade():
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('keywords', sa.Text(), nullable=True))
+
+    connection = op.get_bind()
+
+    keywords = {}
+    for article_id, keyword in connection.execute(sa.select(
+        article_keywords.c.article_id, article_keywords.c.keyword
+    ).order_by(article_keywords.c.article_id, article_keywords.c.position)):
+        keywords.setdefault(article_id, []).append(keyword)
+
+    for article_id, words in keywords.items():
+        connection.execute(articles.update().where(articles.c.id == article_id).values(
+            keywords=str(words)))
+
+    with op.batch_alter_table('article_keywords', schema=None) as batch_op:
+        batch_op.drop_index('ix_article_keywords_normalized_article')
+
+    op.drop_table('article_keywords')
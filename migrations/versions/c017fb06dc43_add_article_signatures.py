@@ -0,0 +1,40 @@
+"""add article signatures
+
+Revision ID: c017fb06dc43
+Revises: 56316d424468
+Create Date: 2026-10-17 19:14:23.527709
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c017fb06dc43'
+down_revision = '56316d424468'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # articles are unique per user and link from now on, keep the latest copy
+    op.execute(
+        "DELETE FROM articles WHERE link IS NOT NULL AND id NOT IN ("
+        "SELECT id FROM (SELECT MAX(id) AS id FROM articles "
+        "WHERE link IS NOT NULL GROUP BY user_id, link) AS latest)"
+    )
+
+    # existing articles get no signature: the next ingestion of their user
+    # has no date to start from, fetches every query in full and signs the
+    # articles still matched (the others are pruned)
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('signature', sa.String(length=64), nullable=True))
+        batch_op.create_unique_constraint('uq_articles_user_link', ['user_id', 'link'])
+        batch_op.create_index('ix_articles_user_signature_date', ['user_id', 'signature', 'date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.drop_index('ix_articles_user_signature_date')
+        batch_op.drop_constraint('uq_articles_user_link', type_='unique')
+        batch_op.drop_column('signature')
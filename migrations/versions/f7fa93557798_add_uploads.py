@@ -0,0 +1,35 @@
+"""add uploads
+
+Revision ID: f7fa93557798
+Revises: 3611707bcdb7
+Create Date: 2026-10-17 19:18:27.820130
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7fa93557798'
+down_revision = '3611707bcdb7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('uploads',
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('url', sa.String(length=256), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(length=128), nullable=True),
+    sa.Column('renditions', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash')
+    )
+
+
+def downgrade():
+    op.drop_table('uploads')
@@ -37,6 +37,10 @@ def create_app(script_info=None):
     migrate.init_app(app, db)
     bcrypt.init_app(app)
 
+    # set up process pools
+    from project import processing
+    processing.init_app(app)
+
     # register blueprints
     from project.api import auth_blueprint
     app.register_blueprint(auth_blueprint)
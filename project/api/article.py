@@ -1,12 +1,15 @@
+import json
 import logging
-from flask import jsonify, request, Blueprint
+from flask import current_app, jsonify, request, Blueprint, Response, stream_with_context
 
-from project import db
-from project.api.authentications import authenticate
-from project.api.validators import email_validator, field_type_validator, required_validator
-from project.api.utils import get_bullet_points, get_news, get_news_sources, TOPICS
+from project.api.authentications import authenticate, is_admin
+from project.api.utils import TOPICS
+from project.api.summaries import get_summary, stream_summary, ENGINES
+from project.api.catalog import source_catalog
+from project.exceptions import ServiceUnavailableError
+from project.api.pagination import paginate_feed
 
-from project.models import Role, User, Article, Keyword
+from project.models import Article, ArticleKeyword, search_articles
 
 
 article_blueprint = Blueprint('article', __name__, template_folder='templates')
@@ -55,13 +58,9 @@ def get_sources(user_id: int):
     try:
         # list of topics separated by comma
         topics = request.args.get('topics', None)
+        topics = [topic.strip().lower() for topic in topics.split(',')] if topics else None
 
-        sources = []
-        if topics:
-            for topic in topics.split(','):
-                sources.extend(get_news_sources(topic.strip())['sources'])
-        else:
-            sources = get_news_sources(topics)['sources']
+        sources = source_catalog.get(topics)
 
         response_object["status"] = True
         response_object["message"] = "Sources retrieved successfully."
@@ -85,9 +84,7 @@ def get_all_articles(user_id: int):
     }
 
     try:
-        admin = User.query.filter_by(id=user_id, role=Role.ADMIN).first()
-
-        if not admin:
+        if not is_admin():
             response_object['message'] = 'Unauthorized access.'
             return jsonify(response_object), 401
 
@@ -115,8 +112,8 @@ def get_single_article(user_id: int, article_id: int):
     }
 
     try:
-        article = Article.query.filter_by(
-            id=article_id, user_id=user_id).first()
+        article = Article.for_user(user_id).filter(
+            Article.id == article_id).first()
 
         if not article:
             response_object['message'] = 'Article not found.'
@@ -124,7 +121,7 @@ def get_single_article(user_id: int, article_id: int):
 
         response_object["status"] = True
         response_object["message"] = "Article retrieved successfully."
-        response_object["data"] = article.to_dict()
+        response_object["data"] = article.to_dict(user_id=user_id)
 
         return jsonify(response_object), 200
 
@@ -134,6 +131,100 @@ def get_single_article(user_id: int, article_id: int):
         return jsonify(response_object), 400
 
 
+@article_blueprint.route('/article/get/<article_id>/bullets', methods=['GET'])
+@authenticate
+def get_article_bullets(user_id: int, article_id: int):
+    """
+    Get bullet points of single article, written on first read:
+    - engine: auto, openai or local (SUMMARY_ENGINE if not given)
+    """
+    response_object = {
+        'status': False,
+        'message': 'Invalid payload.'
+    }
+
+    try:
+        engine = request.args.get('engine', current_app.config.get('SUMMARY_ENGINE')).lower()
+
+        if engine not in ENGINES:
+            response_object['message'] = 'Engine must be one of: ' + ', '.join(ENGINES) + '.'
+            return jsonify(response_object), 400
+
+        article = Article.for_user(user_id).filter(
+            Article.id == article_id).first()
+
+        if not article:
+            response_object['message'] = 'Article not found.'
+            return jsonify(response_object), 404
+
+        summary = get_summary(article, engine=engine)
+
+        response_object["status"] = True
+        response_object["message"] = "Bullet points retrieved successfully."
+        response_object["data"] = dict(summary, article_id=article.id)
+
+        return jsonify(response_object), 200
+
+    except ServiceUnavailableError as e:
+        response_object['message'] = str(e)
+        return jsonify(response_object), 503
+
+    except Exception as e:
+        logger.error(e)
+        response_object['message'] = 'Try again: ' + str(e)
+        return jsonify(response_object), 400
+
+
+@article_blueprint.route('/article/get/<article_id>/bullets/stream', methods=['GET'])
+@authenticate
+def stream_article_bullets(user_id: int, article_id: int):
+    """
+    Stream bullet points of single article as server-sent events:
+    - summary: the stored bullet points, sent at once
+    - token: a piece of text as the model writes it
+    - done: the bullet points once written and stored
+    - error: the message of a failure while streaming
+    """
+    response_object = {
+        'status': False,
+        'message': 'Invalid payload.'
+    }
+
+    try:
+        article = Article.for_user(user_id).filter(
+            Article.id == article_id).first()
+
+        if not article:
+            response_object['message'] = 'Article not found.'
+            return jsonify(response_object), 404
+
+        def events():
+            try:
+                for event, data in stream_summary(article):
+                    if event != 'token':
+                        data = dict(data, article_id=article.id)
+                    yield 'event: {}\ndata: {}\n\n'.format(event, json.dumps(data))
+
+            except Exception as e:
+                logger.error(e)
+                yield 'event: error\ndata: {}\n\n'.format(json.dumps({'message': str(e)}))
+
+        return Response(
+            stream_with_context(events()),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                # do not let nginx buffer the stream
+                'X-Accel-Buffering': 'no',
+            }
+        )
+
+    except Exception as e:
+        logger.error(e)
+        response_object['message'] = 'Try again: ' + str(e)
+        return jsonify(response_object), 400
+
+
 @article_blueprint.route('/article/get/<page>/<limit>', methods=['GET'])
 @authenticate
 def get_articles(user_id: int, page: int, limit: int):
@@ -144,7 +235,7 @@ def get_articles(user_id: int, page: int, limit: int):
     }
 
     try:
-        articles = Article.query.filter_by(user_id=user_id).paginate(
+        articles = Article.feed(user_id).paginate(
             page=int(page), per_page=int(limit), error_out=False)
 
         if not articles:
@@ -153,7 +244,7 @@ def get_articles(user_id: int, page: int, limit: int):
         
         response_object["status"] = True
         response_object["message"] = "Articles retrieved successfully."
-        response_object["data"] = [article.to_dict()
+        response_object["data"] = [article.to_dict(user_id=user_id)
                                    for article in articles.items]
         response_object["total"] = articles.total
         response_object["pages"] = articles.pages
@@ -169,6 +260,44 @@ def get_articles(user_id: int, page: int, limit: int):
         return jsonify(response_object), 400
 
 
+@article_blueprint.route('/article/feed/<limit>', methods=['GET'])
+@authenticate
+def get_articles_feed(user_id: int, limit: int):
+    """
+    Get articles, newest first, by cursor:
+    - limit: articles per page, capped at FEED_MAX_LIMIT
+    - cursor: next_cursor of the previous page (first page if not given)
+    - count: set to false to skip counting the total
+    """
+    response_object = {
+        'status': False,
+        'message': 'Invalid payload.'
+    }
+
+    try:
+        cursor = request.args.get('cursor')
+        with_total = request.args.get('count', 'true').lower() not in ('false', '0', 'no')
+
+        articles = paginate_feed(
+            Article.feed(user_id), limit=int(limit), cursor=cursor, with_total=with_total,
+            max_limit=current_app.config.get('FEED_MAX_LIMIT'))
+
+        response_object["status"] = True
+        response_object["message"] = "Articles retrieved successfully."
+        response_object["data"] = [article.to_dict(user_id=user_id)
+                                   for article in articles["items"]]
+        response_object["total"] = articles["total"]
+        response_object["next_cursor"] = articles["next_cursor"]
+        response_object["has_next"] = articles["has_next"]
+
+        return jsonify(response_object), 200
+
+    except Exception as e:
+        logger.error(e)
+        response_object['message'] = 'Try again: ' + str(e)
+        return jsonify(response_object), 400
+
+
 @article_blueprint.route('/article/get/<page>/<limit>/<keyword>', methods=['GET'])
 @authenticate
 def get_articles_by_keyword(user_id: int, page: int, limit: int, keyword: str):
@@ -180,12 +309,13 @@ def get_articles_by_keyword(user_id: int, page: int, limit: int, keyword: str):
     }
 
     try:
-        articles = Article.query.filter(
-            Article.user_id == user_id, Article.keywords.contains(keyword)).paginate(
-            page=page, per_page=limit, error_out=False)
+        articles = Article.for_user(user_id).join(
+            ArticleKeyword, ArticleKeyword.article_id == Article.id).filter(
+            ArticleKeyword.normalized == keyword.strip().lower()).paginate(
+            page=int(page), per_page=int(limit), error_out=False)
         response_object["status"] = True
         response_object["message"] = "Articles retrieved successfully."
-        response_object["data"] = [article.to_dict()
+        response_object["data"] = [article.to_dict(user_id=user_id)
                                    for article in articles.items]
         response_object["total"] = articles.total
         response_object["pages"] = articles.pages
@@ -199,3 +329,41 @@ def get_articles_by_keyword(user_id: int, page: int, limit: int, keyword: str):
         logger.error(e)
         response_object['message'] = 'Try again: ' + str(e)
         return jsonify(response_object), 400
+
+
+@article_blueprint.route('/article/search/<page>/<limit>', methods=['GET'])
+@authenticate
+def search_user_articles(user_id: int, page: int, limit: int):
+    """Search articles by title and summary"""
+
+    response_object = {
+        'status': False,
+        'message': 'Invalid payload.'
+    }
+
+    try:
+        query = request.args.get('q', '').strip()
+
+        if not query:
+            response_object['message'] = 'Search query is required.'
+            return jsonify(response_object), 400
+
+        articles = search_articles(
+            user_id=user_id, query=query, page=int(page), limit=int(limit))
+
+        response_object["status"] = True
+        response_object["message"] = "Articles retrieved successfully."
+        response_object["data"] = [article.to_dict(user_id=user_id)
+                                   for article in articles["items"]]
+        response_object["total"] = articles["total"]
+        response_object["pages"] = articles["pages"]
+        response_object["page"] = articles["page"]
+        response_object["has_next"] = articles["has_next"]
+        response_object["has_prev"] = articles["has_prev"]
+
+        return jsonify(response_object), 200
+
+    except Exception as e:
+        logger.error(e)
+        response_object['message'] = 'Try again: ' + str(e)
+        return jsonify(response_object), 400
@@ -1,10 +1,13 @@
 import logging
 from datetime import datetime, timedelta
-from flask import jsonify, request, Blueprint
+from flask import g, jsonify, request, Blueprint
+from sqlalchemy.exc import IntegrityError
 
-from project import db
+from project import db, metrics
+from project.exceptions import ServiceUnavailableError
 from project.api.upload import upload
-from project.api.authentications import authenticate
+from project.api.images import PROFILE_IMAGE_SIZES
+from project.api.authentications import authenticate, blacklist_cache, current_user, is_admin
 from project.api.validators import email_validator, field_type_validator, required_validator
 
 from project.models import Role, User, BlacklistToken, Subscription, UserSubscription
@@ -21,29 +24,25 @@ def health():
     }), 200
 
 
-@auth_blueprint.route('/users/auth/access_token', methods=['GET'])
+@auth_blueprint.route('/metrics', methods=['GET'])
 @authenticate
-def get_access_token(user_id):
-    """Get access token"""
-    user = User.query.filter_by(id=int(user_id)).first()
-
+def get_metrics(user_id):
+    """Get cache and worker metrics of this process"""
     response_object = {
         'status': False,
         'message': 'Invalid payload.'
     }
 
     try:
-        auth_token = user.encode_auth_token(user.id)
-        if auth_token:
-            response_object["status"] = True
-            response_object["message"] = "Access token generated successfully."
-            response_object["data"] = {
-                "auth_token": auth_token,
-                "id": user.id,
-                "role": user.role.name,
-            }
-
-            return jsonify(response_object), 200
+        if not is_admin():
+            response_object['message'] = 'Unauthorized access.'
+            return jsonify(response_object), 401
+
+        response_object["status"] = True
+        response_object["message"] = "Metrics retrieved successfully."
+        response_object["data"] = metrics.snapshot()
+
+        return jsonify(response_object), 200
 
     except Exception as e:
         logger.error(e)
@@ -89,6 +88,16 @@ def login():
                 response_object['message'] = 'Account is suspended by admin.'
                 return jsonify(response_object), 401
 
+            # upgrade (or downgrade) hashes made with another cost factor,
+            # a busy hashing pool only postpones it to the next login
+            if user.needs_rehash():
+                try:
+                    user.set_password(password)
+                    db.session.commit()
+                except ServiceUnavailableError as e:
+                    db.session.rollback()
+                    logger.warning(e)
+
             auth_token = user.encode_auth_token(user.id)
             if auth_token:
                 response_object["status"] = True
@@ -97,6 +106,7 @@ def login():
                     "id": user.id,
                     "role": user.role.name,
                     "auth_token": auth_token,
+                    "refresh_token": user.encode_refresh_token(),
                 }
 
                 return jsonify(response_object), 200
@@ -105,16 +115,100 @@ def login():
             response_object['message'] = 'Email or password is incorrect.'
             return jsonify(response_object), 401
 
+    except ServiceUnavailableError as e:
+        db.session.rollback()
+        response_object['message'] = str(e)
+        return jsonify(response_object), 503
+
     except Exception as e:
         logger.error(e)
         response_object['message'] = 'Try again: ' + str(e)
         return jsonify(response_object), 400
 
 
-@auth_blueprint.route('/users/auth/logout', methods=['GET'])
+@auth_blueprint.route('/users/auth/refresh', methods=['POST'])
+def refresh_access_token():
+    """
+    Get a new access token for a refresh token. The refresh token is
+    rotated: it is revoked and a new one is returned along with the access token.
+    """
+    post_data = request.get_json()
+
+    response_object = {
+        'status': False,
+        'message': 'Invalid payload.'
+    }
+
+    if not post_data:
+        return jsonify(response_object), 400
+
+    try:
+        field_types = {"refresh_token": str}
+        post_data = field_type_validator(post_data, field_types)
+        required_validator(post_data, list(field_types.keys()))
+
+        refresh_token = post_data.get('refresh_token')
+
+        payload = User.decode_token(refresh_token)
+        if isinstance(payload, str):
+            response_object['message'] = payload
+            return jsonify(response_object), 401
+
+        if payload.get('type') != 'refresh':
+            response_object['message'] = 'Invalid token. Please log in again.'
+            return jsonify(response_object), 401
+
+        # the refresh token is the one credential checked for revocation
+        if BlacklistToken.check_blacklist(refresh_token):
+            response_object['message'] = 'Token blacklisted. Please log in again.'
+            return jsonify(response_object), 401
+
+        user = User.query.get(payload['sub'])
+
+        if not user or not user.is_active:
+            response_object['message'] = 'Provide a valid auth token.'
+            return jsonify(response_object), 401
+
+        if user.is_suspended:
+            response_object['message'] = 'Account suspended. Please contact admin.'
+            return jsonify(response_object), 401
+
+        # revoke the used refresh token, a replayed one fails the check above
+        revoke_token(refresh_token)
+
+        response_object["status"] = True
+        response_object["message"] = "Access token generated successfully."
+        response_object["data"] = {
+            "auth_token": user.encode_auth_token(user.id),
+            "refresh_token": user.encode_refresh_token(),
+            "id": user.id,
+            "role": user.role.name,
+        }
+
+        return jsonify(response_object), 200
+
+    except IntegrityError:
+        # the same refresh token was used by a concurrent request
+        db.session.rollback()
+        response_object['message'] = 'Token blacklisted. Please log in again.'
+        return jsonify(response_object), 401
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(e)
+        response_object['message'] = 'Try again: ' + str(e)
+        return jsonify(response_object), 400
+
+
+@auth_blueprint.route('/users/auth/logout', methods=['GET', 'POST'])
 @authenticate
 def logout(user_id):
-    """Logout user"""
+    """
+    Logout user:
+    - revokes the refresh token given as refresh_token in the JSON body,
+      required unless the auth token is a legacy long-lived token
+    - revokes the auth token if it is a legacy long-lived token
+    """
 
     response_object = {
         'status': False,
@@ -125,10 +219,32 @@ def logout(user_id):
         # get auth token
         auth_header = request.headers.get('Authorization')
         auth_token = auth_header.split(" ")[1]
+        is_legacy = User.decode_token(auth_token).get('type') is None
+
+        post_data = request.get_json(silent=True) or {}
+        refresh_token = post_data.get('refresh_token')
+
+        if not refresh_token and not is_legacy:
+            response_object['message'] = 'Provide the refresh token to log out.'
+            return jsonify(response_object), 400
+
+        # access tokens expire on their own, revoke the rest
+        tokens = []
+        if refresh_token:
+            payload = User.decode_token(refresh_token)
+
+            if isinstance(payload, str) or payload.get('type') != 'refresh' \
+                    or payload['sub'] != g.auth_user_id:
+                response_object['message'] = 'Invalid refresh token.'
+                return jsonify(response_object), 400
+
+            tokens.append(refresh_token)
+
+        if is_legacy:
+            tokens.append(auth_token)
 
-        # blacklist token
-        blacklist_token = BlacklistToken(token=auth_token)
-        blacklist_token.save()
+        for token in tokens:
+            revoke_token(token)
 
         response_object['status'] = True
         response_object['message'] = 'Successfully logged out.'
@@ -141,6 +257,16 @@ def logout(user_id):
         return jsonify(response_object), 400
 
 
+def revoke_token(token: str):
+    """
+    Blacklist a token in the database and in this worker, if not blacklisted yet
+    """
+    if not BlacklistToken.check_blacklist(token):
+        BlacklistToken(token=token).save()
+
+    blacklist_cache.add(token)
+
+
 @auth_blueprint.route('/users/auth/register', methods=['POST'])
 def register():
     post_data = request.get_json()
@@ -211,11 +337,17 @@ def register():
         response_object['data'] = {
             'id': new_user.id,
             "role": new_user.role.name,
-            'auth_token': auth_token
+            'auth_token': auth_token,
+            'refresh_token': new_user.encode_refresh_token()
         }
 
         return jsonify(response_object), 201
 
+    except ServiceUnavailableError as e:
+        db.session.rollback()
+        response_object['message'] = str(e)
+        return jsonify(response_object), 503
+
     except Exception as e:
         db.session.rollback()
         logger.error(e)
@@ -227,7 +359,7 @@ def register():
 @authenticate
 def get_user_status(user_id):
     """Get user status"""
-    user = User.query.filter_by(id=int(user_id)).first()
+    user = current_user()
 
     response_object = {
         'status': True,
@@ -262,7 +394,7 @@ def update_user(user_id):
         }
         post_data = field_type_validator(post_data, field_types)
 
-        user = User.query.filter_by(id=int(user_id)).first()
+        user = current_user()
 
         firstname = post_data.get('firstname')
         lastname = post_data.get('lastname')
@@ -284,6 +416,11 @@ def update_user(user_id):
 
         return jsonify(response_object), 200
 
+    except ServiceUnavailableError as e:
+        db.session.rollback()
+        response_object['message'] = str(e)
+        return jsonify(response_object), 503
+
     except Exception as e:
         db.session.rollback()
         logger.error(e)
@@ -293,9 +430,12 @@ def update_user(user_id):
 
 @auth_blueprint.route('/users/auth/upload', methods=['POST'])
 @authenticate
-@upload
-def upload_user(file, user_id):
-    """Upload user image"""
+@upload(renditions=PROFILE_IMAGE_SIZES, original=False)
+def upload_user(file, user_id, renditions=None):
+    """
+    Upload user image as resized renditions, stripped of metadata.
+    profile_image is the largest rendition.
+    """
     response_object = {
         'status': False,
         'message': 'Invalid payload.'
@@ -305,9 +445,9 @@ def upload_user(file, user_id):
         return jsonify(response_object), 400
 
     try:
-        user = User.query.filter_by(id=int(user_id)).first()
+        user = current_user()
 
-        user.update(profile_image=file)
+        user.update(profile_image=file, profile_images=renditions or None)
 
         response_object['status'] = True
         response_object['message'] = 'User updated successfully.'
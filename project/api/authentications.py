@@ -1,9 +1,152 @@
+import math
+import time
+import threading
+from datetime import timedelta
 from functools import wraps
-from flask import jsonify, request
+from flask import current_app, g, jsonify, request
 
+from project import metrics
 from project.models import User, Role, BlacklistToken
 
 
+def token_digest(auth_token: str) -> bytes:
+    """
+    Fixed-size digest of an auth token (as stored in BlacklistToken.digest)
+    """
+    return bytes.fromhex(BlacklistToken.digest_token(auth_token))
+
+
+class BloomFilter(object):
+    """
+    Bloom filter over token digests: "not in" answers are always right,
+    "in" answers are right except for a false positive rate of error_rate
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.size = int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest: bytes):
+        # double hashing over two halves of the (already uniform) digest
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, digest: bytes):
+        for position in self._positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, digest: bytes):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(digest)
+        )
+
+
+class BlacklistCache(object):
+    """
+    In-memory view of the token blacklist. Tokens missing from the Bloom
+    filter are not blacklisted and never reach the database; possible hits
+    are confirmed against the database once and then remembered.
+    Rows added by other workers are picked up every resync interval, by
+    blacklisted_on with an overlap window: ids and timestamps are assigned
+    before commit, so a row can become visible after newer ones.
+    """
+
+    def __init__(self, capacity: int = 100000):
+        self.capacity = capacity
+        self._bloom = BloomFilter(capacity)
+        self._confirmed = set()
+        self._synced_until = None
+        self._next_sync = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_checks = 0
+
+    def is_blacklisted(self, auth_token: str) -> bool:
+        """
+        Check whether auth token has been blacklisted
+        """
+        self._maybe_resync()
+        digest = token_digest(auth_token)
+
+        if digest not in self._bloom:
+            self.memory_hits += 1
+            return False
+
+        if digest in self._confirmed:
+            self.memory_hits += 1
+            return True
+
+        self.db_checks += 1
+        if BlacklistToken.check_blacklist(auth_token):
+            self._confirmed.add(digest)
+            return True
+
+        return False
+
+    def add(self, auth_token: str):
+        """
+        Blacklist auth token in this worker right away
+        """
+        digest = token_digest(auth_token)
+        with self._lock:
+            self._bloom.add(digest)
+            self._confirmed.add(digest)
+
+    def _maybe_resync(self):
+        if time.monotonic() < self._next_sync:
+            return
+
+        with self._lock:
+            if time.monotonic() < self._next_sync:
+                return
+
+            query = BlacklistToken.query.with_entities(
+                BlacklistToken.digest, BlacklistToken.blacklisted_on)
+
+            if self._synced_until is not None:
+                overlap = timedelta(seconds=current_app.config.get("BLACKLIST_RESYNC_OVERLAP_SECONDS"))
+                query = query.filter(BlacklistToken.blacklisted_on >= self._synced_until - overlap)
+
+            rows = query.all()
+
+            # grow the filter before it goes over capacity
+            if self._bloom.count + len(rows) > self.capacity:
+                self.capacity *= 2
+                self._bloom = BloomFilter(self.capacity)
+                self._confirmed = set()
+                rows = BlacklistToken.query.with_entities(
+                    BlacklistToken.digest, BlacklistToken.blacklisted_on).all()
+
+            for digest, blacklisted_on in rows:
+                digest = bytes.fromhex(digest)
+                # rows of the overlap window were added at the previous resync
+                if digest not in self._bloom:
+                    self._bloom.add(digest)
+
+                if self._synced_until is None or blacklisted_on > self._synced_until:
+                    self._synced_until = blacklisted_on
+
+            self._next_sync = time.monotonic() + current_app.config.get("BLACKLIST_RESYNC_SECONDS")
+
+    def stats(self) -> dict:
+        return {
+            "size": self._bloom.count,
+            "capacity": self.capacity,
+            "memory_hits": self.memory_hits,
+            "db_checks": self.db_checks,
+        }
+
+
+blacklist_cache = BlacklistCache()
+metrics.register("token_blacklist", blacklist_cache.stats)
+
+
 def authenticate(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -16,39 +159,57 @@ def authenticate(f):
 
         try:
             auth_token = auth_header.split(" ")[1]
-
-            if BlacklistToken.check_blacklist(auth_token):
-                response_object["message"] = "Token blacklisted. Please log in again."
-                return jsonify(response_object), 401
-
         except:
             return jsonify(response_object), 401
 
-        user_id = request.args.get('user_id')
+        payload = User.decode_token(auth_token)
+        if isinstance(payload, str):
+            response_object["message"] = payload
+            return jsonify(response_object), 401
 
-        if user_id:
-            if is_superadmin(auth_header):
+        token_type = payload.get("type")
 
-                user = User.query.filter_by(id=user_id).first()
+        if token_type == "access":
+            # short-lived, verified by signature alone
+            principal = {
+                "id": payload["sub"],
+                "role": payload["role"],
+                "is_active": payload["is_active"],
+                "is_suspended": payload["is_suspended"],
+            }
 
-                if user:
-                    return f(user_id, *args, **kwargs)
+        elif token_type is None:
+            # tokens issued before access/refresh tokens
+            if blacklist_cache.is_blacklisted(auth_token):
+                response_object["message"] = "Token blacklisted. Please log in again."
+                return jsonify(response_object), 401
 
-        resp = User.decode_auth_token(auth_token)
-        if isinstance(resp, str):
-            response_object["message"] = resp
-            return jsonify(response_object), 401
+            principal = User.get_principal(payload["sub"])
 
-        user = User.query.filter_by(id=resp).first()
+        else:
+            response_object["message"] = "Refresh tokens only work with /users/auth/refresh."
+            return jsonify(response_object), 401
 
-        if not user or not user.is_active:
+        if not principal or not principal["is_active"]:
             return jsonify(response_object), 401
 
-        if user.is_suspended:
+        if principal["is_suspended"]:
             response_object["message"] = "Account suspended. Please contact admin."
             return jsonify(response_object), 401
 
-        return f(resp, *args, **kwargs)
+        set_principal(principal)
+        g.auth_user_id = principal["id"]
+
+        # admins may act on behalf of another user
+        user_id = request.args.get('user_id')
+
+        if user_id and user_id.isdigit() and is_superadmin(principal):
+            target = User.get_principal(user_id)
+
+            if target:
+                set_principal(target)
+
+        return f(g.user_id, *args, **kwargs)
 
     return decorated_function
 
@@ -72,25 +233,44 @@ def require_secure_transport(f):
     return is_https
 
 
-def is_superadmin(auth_header):
-    try:
-        auth_token = auth_header.split(" ")[1]
-    except:
+def is_superadmin(principal: dict) -> bool:
+    """
+    Check whether the principal is an active, unsuspended admin
+    """
+    if not principal or not principal["is_active"]:
         return False
 
-    resp = User.decode_auth_token(auth_token)
-    if isinstance(resp, str):
+    if principal["is_suspended"]:
         return False
 
-    user = User.query.filter_by(id=resp).first()
+    if principal["role"] == Role.ADMIN.name:
+        return True
 
-    if not user or not user.is_active:
-        return False
+    return False
 
-    if user.is_suspended:
-        return False
 
-    if user.role == Role.ADMIN:
-        return True
+def set_principal(principal: dict):
+    """
+    Make the current request act as the given principal
+    """
+    g.principal = principal
+    g.user_id = principal["id"]
+    g.role = Role[principal["role"]]
+    g.pop("user", None)
 
-    return False
+
+def current_user() -> User:
+    """
+    User the current request acts as, loaded on first use
+    """
+    if "user" not in g:
+        g.user = User.query.get(g.user_id)
+
+    return g.user
+
+
+def is_admin() -> bool:
+    """
+    Check whether the current request acts as an admin
+    """
+    return g.role == Role.ADMIN
@@ -0,0 +1,156 @@
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+
+from project import db
+from project.models import CatalogSource, Source
+from project.api.jobs import submit_task
+from project.api.utils import get_news_sources, TOPICS
+
+"""
+    Local NewsCatcher source catalog.
+
+    Sources of every topic are stored in the source_catalog table and served
+    from an in-memory, deduplicated topic -> sources index. Refreshes run in
+    the background, at most once every SOURCE_CATALOG_RETRY_SECONDS; until
+    the first one fills the catalog, the sources users follow are served.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class SourceCatalog(object):
+    """
+    In-memory topic -> sources index backed by the source_catalog table
+    """
+
+    def __init__(self):
+        self._index = {}
+        self._all = []
+        self._loaded_at = 0
+        self._refreshed_at = None
+        self._refreshing = False
+        self._attempted_at = None
+        self._last_error = None
+        self._fallback = []
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Rebuild the in-memory index from the database
+        """
+        rows = CatalogSource.query.order_by(
+            CatalogSource.topic, CatalogSource.name).all()
+
+        index = {}
+        refreshed_at = None
+        for row in rows:
+            index.setdefault(row.topic, []).append(row.name)
+            if refreshed_at is None or row.updated_at > refreshed_at:
+                refreshed_at = row.updated_at
+
+        fallback = []
+        if not index:
+            fallback = [
+                name for name, in db.session.query(Source.name).distinct().order_by(Source.name)
+            ]
+
+        with self._lock:
+            self._index = index
+            self._all = sorted({name for names in index.values() for name in names})
+            self._refreshed_at = refreshed_at
+            self._fallback = fallback
+            self._loaded_at = time.monotonic()
+
+    def refresh(self, topics: list = None) -> int:
+        """
+        Fetch the sources of every topic from NewsCatcher and replace the
+        stored catalog. Topics that fail keep their previous sources.
+        Returns the number of topics that failed.
+        """
+        topics = topics or TOPICS
+        failed = 0
+
+        for topic in topics:
+            try:
+                # bypass the response cache, this is the refresh
+                sources = get_news_sources.uncached(topic)["sources"]
+            except Exception as e:
+                logger.error("Failed to refresh sources of {}: {}".format(topic, e))
+                self._last_error = str(e)
+                failed += 1
+                continue
+
+            CatalogSource.query.filter_by(topic=topic).delete()
+            CatalogSource.bulk_insert(
+                [{"topic": topic, "name": name} for name in set(sources)]
+            )
+
+        self.load()
+        return failed
+
+    def get(self, topics: list = None) -> list:
+        """
+        Get deduplicated sources of the given topics (all topics if none given)
+        """
+        self._ensure_fresh()
+
+        if not self._index:
+            return list(self._fallback)
+
+        if not topics:
+            return list(self._all)
+
+        sources = []
+        seen = set()
+        for topic in topics:
+            for name in self._index.get(topic, []):
+                if name not in seen:
+                    seen.add(name)
+                    sources.append(name)
+
+        return sources
+
+    def _ensure_fresh(self):
+        config = current_app.config
+
+        if time.monotonic() - self._loaded_at > config.get("SOURCE_CATALOG_RELOAD_SECONDS"):
+            self.load()
+
+        # first run, fill the catalog without making the request wait
+        if not self._index:
+            self._schedule_refresh()
+            return
+
+        max_age = timedelta(seconds=config.get("SOURCE_CATALOG_REFRESH_SECONDS"))
+        if self._refreshed_at and datetime.utcnow() - self._refreshed_at > max_age:
+            self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        retry_seconds = current_app.config.get("SOURCE_CATALOG_RETRY_SECONDS")
+
+        with self._lock:
+            if self._refreshing:
+                return
+            # back off after an attempt, failed or not, so a NewsCatcher outage
+            # does not cost every request a refresh
+            if self._attempted_at and time.monotonic() - self._attempted_at < retry_seconds:
+                return
+            self._refreshing = True
+            self._attempted_at = time.monotonic()
+
+        def run():
+            try:
+                failed = self.refresh()
+                if failed:
+                    logger.warning("{} topics failed to refresh, retrying in {} seconds: {}".format(
+                        failed, retry_seconds, self._last_error))
+            finally:
+                self._refreshing = False
+
+        submit_task(run)
+
+
+source_catalog = SourceCatalog()
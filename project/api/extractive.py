@@ -0,0 +1,164 @@
+import re
+import numpy as np
+
+"""
+    Local extractive summarizer.
+
+    TextRank over TF-IDF sentence vectors: sentences of an article are
+    ranked by their centrality in the cosine similarity graph, and the top
+    ones are kept in their original order. Many articles are ranked in one
+    vectorized pass, their sentences sharing a single block-diagonal graph.
+"""
+
+SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])")
+INITIALS = re.compile(r"(?:[A-Za-z]\.)+")
+WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# words that end with a period without ending the sentence
+ABBREVIATIONS = frozenset("""
+    mr mrs ms dr prof sr jr st mt ft gen gov sen rep col lt sgt capt cmdr adm rev hon pres
+    inc ltd co corp bros dept univ approx vs etc al fig vol
+    jan feb mar apr jun jul aug sep sept oct nov dec
+""".split())
+
+STOPWORDS = frozenset("""
+    a about above after again against all also am an and any are as at be because been before
+    being below between both but by can could did do does doing down during each few for from
+    further had has have having he her here hers herself him himself his how i if in into is it
+    its itself just me more most my myself no nor not now of off on once only or other our ours
+    ourselves out over own said same says she should so some such than that the their theirs
+    them themselves then there these they this those through to too under until up very was we
+    were what when where which while who whom why will with would you your yours yourself
+""".split())
+
+
+def is_abbreviation(word: str) -> bool:
+    """
+    Whether a word ending with a period is an abbreviation or initials (Dr., U.S., J.)
+    """
+    word = word.lstrip("\"'([")
+    if not word.endswith("."):
+        return False
+
+    return word[:-1].lower() in ABBREVIATIONS or INITIALS.fullmatch(word) is not None
+
+
+def split_sentences(text: str) -> list:
+    """
+    Split text into sentences, not after abbreviations and initials
+    """
+    text = " ".join((text or "").split())
+
+    sentences = []
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        words = text[start:match.start()].split()
+        if words and is_abbreviation(words[-1]):
+            continue
+
+        sentences.append(text[start:match.start()])
+        start = match.end()
+
+    sentences.append(text[start:])
+    return [sentence for sentence in sentences if sentence]
+
+
+def tokenize(sentence: str) -> list:
+    """
+    Lowercase words of a sentence, without stopwords
+    """
+    return [word for word in WORD.findall(sentence.lower()) if word not in STOPWORDS]
+
+
+def rank_sentences(sentences: list, doc_ids: np.ndarray, damping: float = 0.85,
+                   iterations: int = 50, tolerance: float = 1e-6) -> np.ndarray:
+    """
+    TextRank score of every sentence, sentences only linking to sentences
+    of the same document (doc_ids)
+    """
+    vocabulary = {}
+    rows, cols = [], []
+    for row, sentence in enumerate(sentences):
+        for word in tokenize(sentence):
+            rows.append(row)
+            cols.append(vocabulary.setdefault(word, len(vocabulary)))
+
+    n = len(sentences)
+    tf = np.zeros((n, max(len(vocabulary), 1)), dtype=np.float32)
+    np.add.at(tf, (rows, cols), 1)
+
+    idf = np.log((1 + n) / (1 + np.count_nonzero(tf, axis=0))) + 1
+    vectors = tf * idf.astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms > 0, norms, 1)
+
+    same_doc = doc_ids[:, None] == doc_ids[None, :]
+    similarity = (vectors @ vectors.T) * same_doc
+    np.fill_diagonal(similarity, 0)
+
+    doc_sizes = np.bincount(doc_ids)[doc_ids].astype(np.float32)
+
+    # sentences sharing no word with the others link to their whole document
+    weights = similarity.sum(axis=1, keepdims=True)
+    dangling = weights[:, 0] == 0
+    similarity[dangling] = same_doc[dangling] / doc_sizes[dangling, None]
+    weights[dangling] = 1
+    transition = similarity / weights
+
+    teleport = 1 / doc_sizes
+    scores = teleport.copy()
+    for _ in range(iterations):
+        updated = (1 - damping) * teleport + damping * (transition.T @ scores)
+        converged = np.abs(updated - scores).sum() < tolerance
+        scores = updated
+        if converged:
+            break
+
+    return scores
+
+
+def summarize_texts(texts: list, max_sentences: int = 5, batch_size: int = 64) -> list:
+    """
+    Top max_sentences sentences of every text, in their original order.
+    Texts are ranked batch_size at a time, to bound the similarity matrix.
+    """
+    summaries = []
+
+    for start in range(0, len(texts), batch_size):
+        batch = [split_sentences(text) for text in texts[start:start + batch_size]]
+
+        sentences = [sentence for doc in batch for sentence in doc]
+        if not sentences:
+            summaries.extend([] for _ in batch)
+            continue
+
+        doc_ids = np.repeat(np.arange(len(batch)), [len(doc) for doc in batch])
+        scores = rank_sentences(sentences, doc_ids)
+
+        offset = 0
+        for doc in batch:
+            doc_scores = scores[offset:offset + len(doc)]
+            # highest score first, earlier sentence first on ties
+            top = sorted(np.argsort(-doc_scores, kind="stable")[:max_sentences])
+            summaries.append([doc[index] for index in top])
+            offset += len(doc)
+
+    return summaries
+
+
+def to_bullet_points(sentences: list) -> str:
+    return "\n".join("- {}".format(sentence) for sentence in sentences)
+
+
+def get_extractive_bullet_points(text: str, max_bullet_points: int = 5) -> str:
+    """
+    Get bullet points from text, without leaving the process
+    """
+    return to_bullet_points(summarize_texts([text], max_bullet_points)[0])
+
+
+def get_extractive_bullet_points_batch(texts: list, max_bullet_points: int = 5) -> list:
+    """
+    Get bullet points from many texts in one vectorized pass
+    """
+    return [to_bullet_points(sentences) for sentences in summarize_texts(texts, max_bullet_points)]
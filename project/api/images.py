@@ -0,0 +1,69 @@
+import io
+import shutil
+import logging
+import tempfile
+from flask import current_app
+
+from project.processing import get_pool, render_renditions
+from project.api.utils import upload_file
+
+"""
+    Image renditions.
+
+    Uploaded images are decoded, auto-rotated, stripped of metadata and
+    downscaled to fixed sizes on a process pool, so the CPU-heavy work does
+    not hold the GIL of the request worker.
+"""
+
+logger = logging.getLogger(__name__)
+
+# longest side, in pixels, of every profile image rendition
+PROFILE_IMAGE_SIZES = (64, 256, 1024)
+
+
+def make_renditions(file, sizes: tuple = PROFILE_IMAGE_SIZES) -> dict:
+    """
+    Render renditions of an uploaded file on the process pool.
+    The file is copied in chunks to a temporary file the worker reads by
+    path, so it is never held in memory or pickled.
+    Returns {} for files Pillow cannot read (pdf, svg, heic, ...).
+    """
+    with tempfile.NamedTemporaryFile(prefix="upload-") as temp:
+        file.seek(0)
+        shutil.copyfileobj(file, temp, 64 * 1024)
+        temp.flush()
+
+        future = get_pool("images").submit(
+            render_renditions,
+            temp.name,
+            sizes,
+            current_app.config.get("IMAGE_RENDITION_FORMAT")
+        )
+
+        try:
+            return future.result(timeout=current_app.config.get("IMAGE_TIMEOUT"))
+
+        except Exception as e:
+            future.cancel()
+            logger.error("Could not render renditions: {}".format(e))
+            return {}
+
+        finally:
+            file.seek(0)
+
+
+def upload_renditions(file, filename: str, sizes: tuple = PROFILE_IMAGE_SIZES) -> dict:
+    """
+    Render and upload renditions of an uploaded file.
+    Returns {size: url}.
+    """
+    stem = filename.rsplit(".", 1)[0]
+    urls = {}
+
+    for size, (data, extension) in make_renditions(file, sizes).items():
+        response = upload_file(
+            io.BytesIO(data), "{}_{}.{}".format(stem, size, extension),
+            "image/{}".format("jpeg" if extension == "jpg" else extension))
+        urls[str(size)] = response["url"]
+
+    return urls
@@ -0,0 +1,273 @@
+import json
+import hashlib
+import logging
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from project import db
+from project.models import Article, UserArticle, UserArticleSignature, User, Job
+from project.api.jobs import submit_task, JobCancelled
+from project.api.utils import get_news_by_topic
+from project.api.keywords import get_keywords_batch
+from project.api.summaries import summarize_articles
+
+logger = logging.getLogger(__name__)
+
+
+def build_query(keywords: list) -> str:
+    """
+    Join all keywords with AND and place multi-word keywords in quotes
+    """
+    return " AND ".join(
+        [
+            f'"{keyword}"' if " " in keyword else keyword
+            for keyword in keywords
+        ]
+    )
+
+
+def query_signature(q: str, topic: str, sources: list) -> str:
+    """
+    Signature of a settings query, same settings give the same signature
+    """
+    signature = json.dumps([q, topic, sorted(sources)])
+    return hashlib.sha256(signature.encode("utf-8")).hexdigest()
+
+
+def ingest_articles(job: Job, user_id: int, topics: list, sources: list, keywords: list, incremental: bool = True):
+    """
+    Refresh the user's articles for each topic:
+    - fetch news for all topics concurrently, in incremental mode only
+      news newer than the latest stored article of the same query,
+      counting progress as each topic is done
+    - store articles not seen for any user yet, extracting their keywords
+      in batches on a process pool
+    - upsert the user's feed memberships with the queries that fetched them
+      and prune the ones no query of the settings matches, in a single transaction
+    - optionally summarize the articles in the background
+    A job superseded by a newer ingestion of the same user stops without
+    touching the feed, so the newest settings always win.
+    """
+    check_current(job)
+    job.update(total=len(topics))
+
+    q = build_query(keywords)
+    signatures = {topic: query_signature(q, topic, sources) for topic in topics}
+
+    topic_kwargs = {}
+    if incremental:
+        for topic, since in latest_dates(user_id, signatures).items():
+            topic_kwargs[topic] = {"from_": since.strftime("%Y/%m/%d %H:%M:%S")}
+
+    def topic_done(topic: str, articles: dict):
+        job.update(progress=job.progress + 1)
+
+    responses = get_news_by_topic(
+        q=q,
+        topics=topics,
+        sources=sources,
+        timeout=current_app.config.get("NEWS_FETCH_TIMEOUT"),
+        topic_kwargs=topic_kwargs,
+        on_result=topic_done
+    )
+
+    failed = [
+        "{}: {}".format(topic, articles["message"])
+        for topic, articles in responses.items()
+        if articles["status"] == "error"
+    ]
+    if failed:
+        job.update(message="Failed topics: " + "; ".join(failed))
+
+    fetched = {}
+
+    for topic, articles in responses.items():
+        if articles["status"] == "ok":
+            for article in articles["articles"]:
+                if article.get("link"):
+                    fetched.setdefault(article["link"], (set(), article))[0].add(signatures[topic])
+
+    articles = upsert_articles(job, user_id, fetched, list(signatures.values()))
+
+    if current_app.config.get("SUMMARIZE_ON_INGEST"):
+        submit_task(summarize_articles, [article.id for article, _ in articles],
+                    engine=current_app.config.get("SUMMARY_INGEST_ENGINE"))
+
+
+def check_current(job: Job):
+    """
+    Raise JobCancelled if a newer ingestion job was created for the same user
+    """
+    newest = db.session.query(db.func.max(Job.id)).filter(
+        Job.user_id == job.user_id,
+        Job.kind == job.kind
+    ).scalar()
+
+    if newest != job.id:
+        raise JobCancelled("Superseded by job {}.".format(newest))
+
+
+def latest_dates(user_id: int, signatures: dict) -> dict:
+    """
+    Get the date of the newest article in the user's feed per topic, for topics that have any
+    """
+    rows = db.session.query(
+        UserArticleSignature.signature, db.func.max(UserArticle.date)
+    ).join(
+        UserArticle, UserArticle.id == UserArticleSignature.user_article_id
+    ).filter(
+        UserArticle.user_id == user_id,
+        UserArticleSignature.signature.in_(list(signatures.values()))
+    ).group_by(UserArticleSignature.signature).all()
+
+    newest = dict(rows)
+    return {
+        topic: newest[signature]
+        for topic, signature in signatures.items()
+        if newest.get(signature)
+    }
+
+
+def upsert_articles(job: Job, user_id: int, fetched: dict, signatures: list) -> list:
+    """
+    Add fetched articles to the user's feed along with the signatures of the
+    queries that fetched them, drop signatures of queries that are no longer
+    in the settings and the articles left without any.
+    Returns (article, signatures) pairs of the fetched articles.
+    """
+    articles = get_or_create_articles(fetched)
+
+    # feed writes of a user run one at a time (row lock on the user, where
+    # supported), and only for the newest job
+    User.query.filter_by(id=user_id).with_for_update().one()
+    check_current(job)
+
+    memberships = db.session.query(UserArticle.id).filter(UserArticle.user_id == user_id)
+
+    # prune signatures that no longer match the settings, then the
+    # memberships no query matches anymore
+    UserArticleSignature.query.filter(
+        UserArticleSignature.user_article_id.in_(memberships),
+        UserArticleSignature.signature.notin_(signatures)
+    ).delete(synchronize_session=False)
+
+    unmatched = UserArticle.query.filter(
+        UserArticle.user_id == user_id,
+        ~db.exists().where(UserArticleSignature.user_article_id == UserArticle.id)
+    )
+    pruned = [article_id for article_id, in unmatched.with_entities(UserArticle.article_id)]
+    if pruned:
+        unmatched.delete(synchronize_session=False)
+
+    article_ids = [article.id for article, _ in articles]
+
+    existing = dict(memberships.with_entities(UserArticle.article_id, UserArticle.id).filter(
+        UserArticle.article_id.in_(article_ids)
+    )) if article_ids else {}
+
+    # plain rows, inserted without building ORM objects
+    UserArticle.bulk_insert([
+        {"user_id": user_id, "article_id": article.id, "date": article.date}
+        for article, _ in articles
+        if article.id not in existing
+    ], commit=False)
+
+    if article_ids:
+        existing = dict(memberships.with_entities(UserArticle.article_id, UserArticle.id).filter(
+            UserArticle.article_id.in_(article_ids)
+        ))
+
+    stored = set(
+        UserArticleSignature.query.with_entities(
+            UserArticleSignature.user_article_id, UserArticleSignature.signature
+        ).filter(UserArticleSignature.user_article_id.in_(list(existing.values())))
+    ) if existing else set()
+
+    UserArticleSignature.bulk_insert([
+        {"user_article_id": existing[article.id], "signature": signature}
+        for article, article_signatures in articles
+        for signature in sorted(article_signatures)
+        if (existing[article.id], signature) not in stored
+    ])
+
+    if pruned:
+        # shared articles no other feed has either
+        submit_task(Article.prune_orphans, pruned)
+
+    return articles
+
+
+def get_or_create_articles(fetched: dict) -> list:
+    """
+    Get the shared Article of every fetched article, creating the missing ones.
+    Returns (article, signatures) pairs.
+    """
+    by_hash = {}
+    for link, (signatures, article) in fetched.items():
+        by_hash.setdefault(Article.hash_link(link), (set(), article))[0].update(signatures)
+
+    # another ingestion may insert the same articles concurrently, retry once
+    for attempt in range(2):
+        stored = {
+            article.content_hash: article
+            for article in Article.query.filter(
+                Article.content_hash.in_(list(by_hash.keys()))
+            )
+        } if by_hash else {}
+
+        missing = [
+            (content_hash, article)
+            for content_hash, (_, article) in by_hash.items()
+            if content_hash not in stored
+        ]
+        keywords = get_keywords_batch([article.get("excerpt") or "" for _, article in missing])
+
+        new_articles = []
+        for (content_hash, article), article_keywords in zip(missing, keywords):
+            try:
+                new_articles.append(build_article(content_hash, article, article_keywords))
+            except Exception as e:
+                logger.error(e)
+                continue
+
+        try:
+            Article.bulk_save(new_articles)
+            break
+        except IntegrityError as e:
+            if attempt:
+                raise
+            logger.error(e)
+
+    for article in new_articles:
+        stored[article.content_hash] = article
+
+    return [
+        (stored[content_hash], signatures)
+        for content_hash, (signatures, _) in by_hash.items()
+        if content_hash in stored
+    ]
+
+
+def build_article(content_hash: str, article: dict, keywords: list = None) -> Article:
+    """
+    Build an Article from a NewsCatcher article, extracting its keywords
+    unless given
+    """
+    if keywords is None:
+        keywords = get_keywords_batch([article["excerpt"]])[0]
+
+    author = article["authors"]
+    if isinstance(author, list):
+        author = ", ".join(author)
+
+    return Article(
+        title=article["title"],
+        source=article["clean_url"],
+        author=author or "",
+        date=article["published_date"],
+        summary=article["summary"],
+        link=article["link"],
+        image_url=article["media"],
+        keywords=keywords,
+        content_hash=content_hash,
+    )
@@ -0,0 +1,105 @@
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+from project import db
+from project.models import Job, JobStatus
+
+"""
+    Background job runner.
+
+    Work submitted here runs on a bounded thread pool inside its own
+    application context, and reports its progress through the Job model
+    so that any worker process can serve the status endpoint.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    """
+    Raised by a job that should stop without failing, e.g. superseded by a newer job
+    """
+    pass
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Get (or lazily create) the shared job executor
+    """
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=current_app.config.get("INGESTION_WORKERS"),
+                    thread_name_prefix="job"
+                )
+
+    return _executor
+
+
+def submit_job(job: Job, func, *args, **kwargs):
+    """
+    Queue func(job, *args, **kwargs) on the job executor
+    """
+    app = current_app._get_current_object()
+    return get_executor().submit(_run_job, app, job.id, func, args, kwargs)
+
+
+def submit_task(func, *args, **kwargs):
+    """
+    Queue func(*args, **kwargs) on the job executor without tracking it as a Job
+    """
+    app = current_app._get_current_object()
+    return get_executor().submit(_run_task, app, func, args, kwargs)
+
+
+def _run_task(app, func, args: tuple, kwargs: dict):
+    with app.app_context():
+        try:
+            func(*args, **kwargs)
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(e)
+
+        finally:
+            db.session.remove()
+
+
+def _run_job(app, job_id: int, func, args: tuple, kwargs: dict):
+    with app.app_context():
+        job = Job.query.get(job_id)
+
+        try:
+            job.update(status=JobStatus.RUNNING, started_at=datetime.now())
+            func(job, *args, **kwargs)
+            job.update(status=JobStatus.FINISHED, finished_at=datetime.now())
+
+        except JobCancelled as e:
+            db.session.rollback()
+            logger.info("Job {} cancelled: {}".format(job_id, e))
+            job.update(
+                status=JobStatus.CANCELLED,
+                message=str(e),
+                finished_at=datetime.now()
+            )
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(e)
+            job.update(
+                status=JobStatus.FAILED,
+                message=str(e),
+                finished_at=datetime.now()
+            )
+
+        finally:
+            db.session.remove()
@@ -0,0 +1,159 @@
+import os
+import logging
+import threading
+from concurrent.futures import wait
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+
+from project import metrics, processing
+from project.cache import make_cache, make_key
+
+"""
+    Keyword extraction for ingestion.
+
+    YAKE is pure Python and CPU-bound, so excerpts are extracted in batches
+    on a process pool instead of holding the GIL of the ingestion thread.
+    Results are memoized by excerpt hash: an article ingested again, for
+    another user or on a refresh, skips extraction entirely. Batches still
+    running past KEYWORD_TIMEOUT are given up on, never extracted twice.
+"""
+
+logger = logging.getLogger(__name__)
+
+# keyword cache: memory (per process) or sqlite (shared by workers)
+KEYWORD_CACHE_BACKEND = os.getenv('KEYWORD_CACHE_BACKEND', 'memory')
+KEYWORD_CACHE_PATH = os.getenv('KEYWORD_CACHE_PATH', 'keyword_cache.db')
+KEYWORD_CACHE_SIZE = int(os.getenv('KEYWORD_CACHE_SIZE', 8192))
+
+# keywords of an excerpt never change, entries only leave the cache when it is full
+keyword_cache = make_cache(
+    backend=KEYWORD_CACHE_BACKEND,
+    max_size=KEYWORD_CACHE_SIZE,
+    path=KEYWORD_CACHE_PATH
+)
+metrics.register("keyword_cache", keyword_cache.stats)
+
+class ExtractionStats(object):
+    """
+    Timing of keyword extraction batches
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.texts = 0
+        self.failed_batches = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+        self.last_size = 0
+
+    def record(self, size: int, seconds: float):
+        with self._lock:
+            self.batches += 1
+            self.texts += size
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.last_seconds = seconds
+            self.last_size = size
+
+    def record_failure(self):
+        with self._lock:
+            self.failed_batches += 1
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "failed_batches": self.failed_batches,
+            "total_seconds": round(self.total_seconds, 3),
+            "max_seconds": round(self.max_seconds, 3),
+            "last_seconds": round(self.last_seconds, 3),
+            "last_size": self.last_size,
+            "seconds_per_text": round(self.total_seconds / self.texts, 4) if self.texts else 0.0,
+        }
+
+
+extraction_stats = ExtractionStats()
+metrics.register("keyword_extraction", extraction_stats.stats)
+
+
+def get_keywords_batch(texts: list, max_keywords: int = 10) -> list:
+    """
+    Get keywords of many texts, extracting the ones not seen before
+    in batches on the process pool
+    """
+    keys = [make_key("keywords", text, max_keywords) for text in texts]
+    results = {}
+    missing = {}
+
+    for key, text in zip(keys, texts):
+        if key in results or key in missing:
+            continue
+
+        if not text or not text.strip():
+            results[key] = []
+            continue
+
+        keywords = keyword_cache.get(key)
+        if keywords is None:
+            missing[key] = text
+        else:
+            results[key] = keywords
+
+    if missing:
+        extract_missing(missing, max_keywords, results)
+
+    return [results.get(key, []) for key in keys]
+
+
+def extract_missing(missing: dict, max_keywords: int, results: dict):
+    """
+    Extract keywords of {key: text} in batches on the process pool, caching
+    and adding them to results. Batches not done within KEYWORD_TIMEOUT
+    are cancelled (or left to finish unused when already running), so their
+    texts get no keywords.
+    """
+    config = current_app.config
+    batch_size = config.get("KEYWORD_BATCH_SIZE")
+    items = list(missing.items())
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+
+    pool = processing.get_pool("keywords")
+    try:
+        futures = [
+            pool.submit(processing.extract_keywords, [text for _, text in batch], max_keywords)
+            for batch in batches
+        ]
+    except BrokenProcessPool:
+        # a worker process died earlier, start over with a new pool
+        pool = processing.reset_pool("keywords", pool)
+        futures = [
+            pool.submit(processing.extract_keywords, [text for _, text in batch], max_keywords)
+            for batch in batches
+        ]
+
+    done, not_done = wait(futures, timeout=config.get("KEYWORD_TIMEOUT"))
+
+    for batch, future in zip(batches, futures):
+        if future in not_done:
+            future.cancel()
+            logger.error("Keyword extraction of {} excerpts timed out".format(len(batch)))
+            extraction_stats.record_failure()
+            continue
+
+        try:
+            keywords, seconds = future.result()
+
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                processing.reset_pool("keywords", pool)
+            logger.error("Keyword extraction batch failed: {}".format(e))
+            extraction_stats.record_failure()
+            continue
+
+        extraction_stats.record(len(batch), seconds)
+
+        for (key, _), text_keywords in zip(batch, keywords):
+            keyword_cache.set(key, text_keywords)
+            results[key] = text_keywords
@@ -0,0 +1,73 @@
+import json
+import base64
+from datetime import datetime
+
+from project import db
+from project.models import UserArticle
+
+"""
+    Keyset (cursor) pagination of user feeds.
+
+    Pages are ordered by (date, article id), newest first, and the cursor is
+    the opaque position of the last article of the previous page, so every
+    page is a single index range scan no matter how deep it is.
+"""
+
+
+def encode_cursor(date: datetime, article_id: int) -> str:
+    """
+    Encode a feed position into an opaque cursor token
+    """
+    position = json.dumps({"d": date.isoformat(), "i": article_id})
+    return base64.urlsafe_b64encode(position.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Decode a cursor token into a (date, article_id) feed position
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(position["d"]), int(position["i"])
+
+    except Exception:
+        raise ValueError("Invalid cursor.")
+
+
+def paginate_feed(query, limit: int, cursor: str = None, with_total: bool = True,
+                  max_limit: int = None) -> dict:
+    """
+    Get the page of a feed query (see Article.feed) that follows the cursor,
+    of at most max_limit articles (no cap if None)
+    """
+    if limit < 1:
+        raise ValueError("Limit must be at least 1.")
+
+    if max_limit:
+        limit = min(limit, max_limit)
+
+    total = query.order_by(None).count() if with_total else None
+
+    if cursor:
+        date, article_id = decode_cursor(cursor)
+        query = query.filter(db.or_(
+            UserArticle.date < date,
+            db.and_(UserArticle.date == date, UserArticle.article_id < article_id)
+        ))
+
+    # one extra row tells whether there is a next page
+    items = query.limit(limit + 1).all()
+    has_next = len(items) > limit
+    items = items[:limit]
+
+    next_cursor = None
+    if has_next and items:
+        next_cursor = encode_cursor(items[-1].date, items[-1].id)
+
+    return {
+        "items": items,
+        "total": total,
+        "next_cursor": next_cursor,
+        "has_next": has_next,
+    }
@@ -0,0 +1,154 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+from project import metrics
+from project.exceptions import ServiceUnavailableError
+
+"""
+    Rate-limited scheduling of OpenAI requests.
+
+    Every request of the process takes its share of a requests-per-minute
+    and a tokens-per-minute budget from a shared limiter before it is sent,
+    and batches run on at most max_workers threads at a time.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter(object):
+    """
+    Token buckets for requests and tokens per minute, refilled continuously
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute or 0)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.rejected = 0
+        self.waited = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+
+        self._requests = min(
+            self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._tokens = min(
+                self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens: int = 0, timeout: float = None):
+        """
+        Wait until one request of the given number of tokens is allowed.
+        Raises ServiceUnavailableError at once when that would take longer
+        than timeout seconds (no limit if None).
+        """
+        if self.tokens_per_minute:
+            # a request larger than the whole budget waits for a full bucket
+            tokens = min(tokens, self.tokens_per_minute)
+
+        started_at = time.monotonic()
+
+        while True:
+            with self._lock:
+                self._refill()
+
+                missing_requests = max(0, 1 - self._requests)
+                missing_tokens = max(0, tokens - self._tokens) if self.tokens_per_minute else 0
+
+                if not missing_requests and not missing_tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens if self.tokens_per_minute else 0
+                    self.acquired += 1
+                    self.waited += time.monotonic() - started_at
+                    return
+
+                wait = max(
+                    missing_requests * 60 / self.requests_per_minute,
+                    missing_tokens * 60 / self.tokens_per_minute if missing_tokens else 0
+                )
+
+                if timeout is not None and time.monotonic() - started_at + wait > timeout:
+                    self.rejected += 1
+                    raise ServiceUnavailableError("OpenAI rate limit reached, please try again shortly.")
+
+            time.sleep(wait)
+
+    def stats(self) -> dict:
+        return {
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "acquired": self.acquired,
+            "rejected": self.rejected,
+            "waited_seconds": round(self.waited, 3),
+        }
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> RateLimiter:
+    """
+    Get (or lazily create) the OpenAI rate limiter of the process
+    """
+    global _limiter
+
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter(
+                    requests_per_minute=current_app.config.get("OPENAI_REQUESTS_PER_MINUTE"),
+                    tokens_per_minute=current_app.config.get("OPENAI_TOKENS_PER_MINUTE")
+                )
+                metrics.register("openai_rate_limit", _limiter.stats)
+
+    return _limiter
+
+
+def run_batches(func, batches: list, costs: list, max_workers: int = 4, retries: int = 2,
+                retry_on: tuple = (), backoff: float = 2.0) -> list:
+    """
+    Run func(batch) for every batch, at most max_workers at a time, each
+    taking its cost in tokens from the rate limiter first. Errors in retry_on
+    are retried with exponential backoff. Returns the result of every batch,
+    in order, None for batches that failed.
+    """
+    limiter = get_limiter()
+
+    def run(batch, cost):
+        for attempt in range(retries + 1):
+            limiter.acquire(cost)
+
+            try:
+                return func(batch)
+
+            except retry_on as e:
+                if attempt == retries:
+                    raise
+                logger.warning("Retrying batch after error: {}".format(e))
+                time.sleep(backoff * 2 ** attempt)
+
+    results = [None] * len(batches)
+    if not batches:
+        return results
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches))),
+                            thread_name_prefix="batch") as executor:
+        futures = [executor.submit(run, batch, cost) for batch, cost in zip(batches, costs)]
+
+        for index, future in enumerate(futures):
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                logger.error("Batch failed: {}".format(e))
+
+    return results
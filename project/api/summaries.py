@@ -0,0 +1,418 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from project import db, metrics
+from project.cache import make_cache
+from project.exceptions import ServiceUnavailableError
+from project.models import Article, Summary
+from project.api.utils import (
+    get_bullet_points, get_bullet_points_batch, stream_bullet_points,
+    pack_batches, estimate_tokens, OPEN_AI_API_KEY, RATE_LIMIT_ERRORS
+)
+from project.api.scheduler import get_limiter, run_batches
+from project.api.extractive import get_extractive_bullet_points, get_extractive_bullet_points_batch
+
+"""
+    Article bullet-point summaries.
+
+    Bullet points are written once per unique article (by content hash) and
+    stored in the article_summaries table. Reads go through a process-local
+    cache, then the database, and only call the LLM for articles that were
+    never summarized; concurrent reads of the same article wait for one call.
+    stream_summary() yields the bullet points as the model writes them.
+
+    Engines:
+    - openai: bullet points written by the model
+    - local: sentences picked by the extractive summarizer, no network
+    - auto: openai within SUMMARY_DEADLINE seconds, local past it or when
+      OpenAI is not configured. A late OpenAI answer still gets stored.
+      After OpenAI fails or misses the deadline for an article, auto reads
+      of it stay local for SUMMARY_RETRY_SECONDS instead of calling again.
+    Local bullet points are replaced by OpenAI ones once those are written.
+
+    Every OpenAI request goes through the process rate limiter; background
+    batches pack several articles into each request. Reads wait at most
+    OPENAI_RATE_LIMIT_WAIT seconds for their share of the limits, then
+    fail (openai) or answer locally (auto, streaming).
+"""
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ("auto", "openai", "local")
+
+# summaries only change from local to openai, entries leave the cache when it is full
+summary_cache = make_cache(backend="memory", max_size=4096)
+metrics.register("summary_cache", summary_cache.stats)
+
+# content hashes auto reads do not call OpenAI for until the entry expires
+openai_retry_after = make_cache(backend="memory", max_size=4096)
+
+# content hash -> [lock, number of requests holding or waiting for it]
+_locks = {}
+_locks_lock = threading.Lock()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _lock_for(content_hash: str) -> threading.Lock:
+    """
+    Get the lock of a content hash, referenced until _release_lock
+    """
+    with _locks_lock:
+        entry = _locks.setdefault(content_hash, [threading.Lock(), 0])
+        entry[1] += 1
+        return entry[0]
+
+
+def _release_lock(content_hash: str):
+    """
+    Drop a reference taken by _lock_for, after releasing the lock itself.
+    The lock is removed once nobody holds or waits for it, so every request
+    for the same hash meanwhile gets the same lock.
+    """
+    with _locks_lock:
+        entry = _locks[content_hash]
+        entry[1] -= 1
+        if not entry[1]:
+            del _locks[content_hash]
+
+
+def get_pool() -> ThreadPoolExecutor:
+    """
+    Get (or lazily create) the pool running OpenAI calls of auto summaries
+    """
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=current_app.config.get("SUMMARY_WORKERS"),
+                    thread_name_prefix="summary"
+                )
+
+    return _pool
+
+
+def _run_in_context(app, func, *args):
+    with app.app_context():
+        try:
+            return func(*args)
+        finally:
+            db.session.remove()
+
+
+def openai_configured() -> bool:
+    return bool(OPEN_AI_API_KEY)
+
+
+def answer_tokens(max_bullet_points: int) -> int:
+    """
+    Rough token count of the bullet points of one article
+    """
+    return max_bullet_points * 40
+
+
+def article_text(article: Article) -> str:
+    """
+    Text of an article sent to the model
+    """
+    return "{}\n\n{}".format(article.title, article.summary or "")
+
+
+def extractive_text(article: Article) -> str:
+    """
+    Text of an article the local summarizer picks sentences from
+    """
+    return article.summary or article.title
+
+
+def find_summary(content_hash: str) -> dict:
+    """
+    Get a stored summary from the cache or the database, None if missing
+    """
+    summary = summary_cache.get(content_hash)
+    if summary is not None:
+        return summary
+
+    row = Summary.query.filter_by(content_hash=content_hash).first()
+    if row is None:
+        return None
+
+    summary = row.to_dict()
+    summary_cache.set(content_hash, summary)
+    return summary
+
+
+def store_summary(content_hash: str, bullets: str, engine: str) -> dict:
+    """
+    Store a summary. A summary stored first by another worker is kept,
+    unless it is a local one being replaced by a model-written one.
+    """
+    try:
+        row = Summary(content_hash=content_hash, bullets=bullets, engine=engine)
+        row.save()
+
+    except IntegrityError:
+        db.session.rollback()
+        row = Summary.query.filter_by(content_hash=content_hash).one()
+
+        if row.engine == "local" and engine != "local":
+            row.update(bullets=bullets, engine=engine)
+
+    summary = row.to_dict()
+    summary_cache.set(content_hash, summary)
+    return summary
+
+
+def get_summary(article: Article, engine: str = "auto") -> dict:
+    """
+    Get the bullet points of an article from the given engine (see ENGINES),
+    writing them on first read
+    """
+    if engine == "local":
+        return get_local_summary(article)
+
+    if engine == "openai":
+        return get_openai_summary(article)
+
+    summary = find_summary(article.content_hash)
+    if summary is not None and summary["engine"] != "local":
+        return summary
+
+    if not openai_configured() or openai_retry_after.get(article.content_hash):
+        return summary or get_local_summary(article)
+
+    app = current_app._get_current_object()
+    future = get_pool().submit(_run_in_context, app, _summarize_article, article.id)
+
+    try:
+        return future.result(timeout=current_app.config.get("SUMMARY_DEADLINE"))
+
+    except TimeoutError:
+        logger.info("OpenAI missed the deadline for article {}".format(article.id))
+
+    except ServiceUnavailableError as e:
+        # the process is out of budget, not OpenAI out of order
+        logger.info("Summarizing article {} locally: {}".format(article.id, e))
+        return summary or get_local_summary(article)
+
+    except Exception as e:
+        logger.error("Could not summarize article {}: {}".format(article.id, e))
+
+    openai_retry_after.set(article.content_hash, True, ttl=current_app.config.get("SUMMARY_RETRY_SECONDS"))
+    return summary or get_local_summary(article)
+
+
+def _summarize_article(article_id: int) -> dict:
+    return get_openai_summary(Article.query.get(article_id))
+
+
+def get_openai_summary(article: Article) -> dict:
+    """
+    Get the bullet points of an article written by the model
+    """
+    summary = find_summary(article.content_hash)
+    if summary is not None and summary["engine"] != "local":
+        return summary
+
+    lock = _lock_for(article.content_hash)
+    try:
+        with lock:
+            # written by another request while waiting for the lock
+            summary = find_summary(article.content_hash)
+            if summary is not None and summary["engine"] != "local":
+                return summary
+
+            text = article_text(article)
+            max_bullet_points = current_app.config.get("SUMMARY_BULLET_POINTS")
+
+            get_limiter().acquire(
+                estimate_tokens(text) + answer_tokens(max_bullet_points),
+                timeout=current_app.config.get("OPENAI_RATE_LIMIT_WAIT")
+            )
+            bullets = get_bullet_points(text, max_bullet_points=max_bullet_points)
+            return store_summary(article.content_hash, bullets, engine="openai")
+
+    finally:
+        _release_lock(article.content_hash)
+
+
+def get_local_summary(article: Article) -> dict:
+    """
+    Get the bullet points of an article picked by the local summarizer.
+    Only stored when the article has no summary yet.
+    """
+    summary = find_summary(article.content_hash)
+    if summary is not None and summary["engine"] == "local":
+        return summary
+
+    bullets = get_extractive_bullet_points(
+        extractive_text(article),
+        max_bullet_points=current_app.config.get("SUMMARY_BULLET_POINTS")
+    )
+
+    if summary is not None:
+        return dict(summary, bullets=bullets, engine="local")
+
+    return store_summary(article.content_hash, bullets, engine="local")
+
+
+def stream_summary(article: Article):
+    """
+    Get the bullet points of an article as (event, data) pairs:
+    - ("summary", summary) at once when the article is summarized by the
+      model already, another request is summarizing it, or OpenAI is not
+      configured or over the rate limit (local bullet points then)
+    - otherwise ("token", {"text": ...}) per piece of text from the model,
+      then ("done", summary) once the bullet points are stored
+    """
+    summary = find_summary(article.content_hash)
+    if summary is not None and summary["engine"] != "local":
+        yield "summary", summary
+        return
+
+    if not openai_configured():
+        yield "summary", summary or get_local_summary(article)
+        return
+
+    lock = _lock_for(article.content_hash)
+    if not lock.acquire(blocking=False):
+        # another request is writing them, wait for it and send them whole
+        _release_lock(article.content_hash)
+        try:
+            summary = get_openai_summary(article)
+        except ServiceUnavailableError as e:
+            logger.info("Summarizing article {} locally: {}".format(article.id, e))
+            summary = summary or get_local_summary(article)
+        yield "summary", summary
+        return
+
+    try:
+        summary = find_summary(article.content_hash)
+        if summary is not None and summary["engine"] != "local":
+            yield "summary", summary
+            return
+
+        text = article_text(article)
+        max_bullet_points = current_app.config.get("SUMMARY_BULLET_POINTS")
+        try:
+            get_limiter().acquire(
+                estimate_tokens(text) + answer_tokens(max_bullet_points),
+                timeout=current_app.config.get("OPENAI_RATE_LIMIT_WAIT")
+            )
+        except ServiceUnavailableError as e:
+            logger.info("Summarizing article {} locally: {}".format(article.id, e))
+            yield "summary", summary or get_local_summary(article)
+            return
+
+        pieces = []
+        for piece in stream_bullet_points(text, max_bullet_points=max_bullet_points):
+            pieces.append(piece)
+            yield "token", {"text": piece}
+
+        yield "done", store_summary(article.content_hash, "".join(pieces), engine="openai")
+
+    finally:
+        lock.release()
+        _release_lock(article.content_hash)
+
+
+def summarize_articles(article_ids: list, engine: str = "auto") -> int:
+    """
+    Write the bullet points of every article not summarized yet, returns
+    how many were written. An article that fails is left for its first read.
+    Local summaries are written in one vectorized pass.
+    """
+    if not article_ids:
+        return 0
+
+    articles = Article.query.outerjoin(
+        Summary, Summary.content_hash == Article.content_hash
+    ).filter(
+        Article.id.in_(article_ids),
+        Summary.id.is_(None)
+    ).all()
+
+    if engine == "local" or (engine == "auto" and not openai_configured()):
+        return summarize_articles_locally(articles)
+
+    return summarize_articles_in_batches(articles)
+
+
+def summarize_articles_in_batches(articles: list) -> int:
+    """
+    Write OpenAI bullet points of articles, several articles per request.
+    Articles missing from a batch answer are summarized one by one.
+    """
+    config = current_app.config
+    max_bullet_points = config.get("SUMMARY_BULLET_POINTS")
+    texts = [article_text(article) for article in articles]
+
+    batches = pack_batches(
+        texts,
+        token_budget=config.get("SUMMARY_BATCH_TOKENS"),
+        max_batch_size=config.get("SUMMARY_BATCH_SIZE"),
+        output_tokens=answer_tokens(max_bullet_points)
+    )
+    costs = [
+        sum(estimate_tokens(texts[index]) + answer_tokens(max_bullet_points) for index in batch)
+        for batch in batches
+    ]
+
+    results = run_batches(
+        lambda batch: get_bullet_points_batch([texts[index] for index in batch], max_bullet_points),
+        batches,
+        costs,
+        max_workers=config.get("SUMMARY_BATCH_CONCURRENCY"),
+        retry_on=RATE_LIMIT_ERRORS
+    )
+
+    count = 0
+    for batch, bullets in zip(batches, results):
+        for index, bullet_points in zip(batch, bullets or [None] * len(batch)):
+            article = articles[index]
+
+            try:
+                if bullet_points:
+                    store_summary(article.content_hash, bullet_points, engine="openai")
+                else:
+                    get_openai_summary(article)
+                count += 1
+
+            except Exception as e:
+                db.session.rollback()
+                logger.error("Could not summarize article {}: {}".format(article.id, e))
+
+    return count
+
+
+def summarize_articles_locally(articles: list) -> int:
+    """
+    Write local bullet points of articles in one vectorized pass
+    """
+    if not articles:
+        return 0
+
+    bullets = get_extractive_bullet_points_batch(
+        [extractive_text(article) for article in articles],
+        max_bullet_points=current_app.config.get("SUMMARY_BULLET_POINTS")
+    )
+
+    rows = [
+        Summary(content_hash=article.content_hash, bullets=text, engine="local")
+        for article, text in zip(articles, bullets)
+    ]
+
+    try:
+        Summary.bulk_save(rows)
+    except IntegrityError:
+        # some were summarized meanwhile, store the others one by one
+        for row in rows:
+            store_summary(row.content_hash, row.bullets, row.engine)
+
+    return len(rows)
@@ -1,23 +1,33 @@
-import os
 import random
 import string
-import base64
 import logging
 from functools import wraps
-from flask import jsonify, request
+from flask import current_app, jsonify, request
+from project import db
+from project.exceptions import APIError
+from project.models import Upload
 from project.api.utils import secure_file, upload_file
+from project.api.images import upload_renditions
 
 """
     Decorator to upload files to the server and return the file path
 
     :param f: function to be decorated
+    :param renditions: sizes of image renditions to upload along with the
+        file, passed to f as renditions={size: url}
+    :param original: upload the file as sent; when False only the renditions
+        (stripped of metadata) are uploaded and f gets the url of the largest
+        one, files that cannot be rendered are rejected
     :return: decorated function
 """
 
 logger = logging.getLogger(__name__)
 
 
-def upload(f):
+def upload(f=None, renditions: tuple = None, original: bool = True):
+    if f is None:
+        return lambda f: upload(f, renditions=renditions, original=original)
+
     @wraps(f)
     def decorated_function(*args, **kwargs):
         response_object = {
@@ -33,54 +43,98 @@ def upload(f):
         if file and file.filename == "":
             return jsonify(response_object), 400
 
-        if allowed_file(file.filename):
-            secured_file = secure_file(file)
-            filename = secured_file["filename"]
+        if not allowed_file(file.filename):
+            return jsonify(response_object), 400
+
+        try:
+            secured_file = secure_file(
+                file, max_size=current_app.config.get("MAX_UPLOAD_SIZE"))
+
+        except APIError as e:
+            response_object["message"] = str(e)
+            return jsonify(response_object), 413
 
-            # get current path
-            current_path = os.path.dirname(os.path.abspath(__name__))
-            file_path = os.path.join(current_path, filename)
-            logger.info("File path: {}".format(file_path))
+        filename = secured_file["filename"]
+        content_hash = secured_file["content_hash"]
 
-            # read binary file and encode it to base64
-            with open(file_path, mode="rb") as img:
-                imgstr = base64.b64encode(img.read())
+        try:
+            # same content uploaded before, reuse it without calling ImageKit
+            stored = Upload.query.filter_by(content_hash=content_hash).first()
 
-            # upload file
-            response = upload_file(imgstr, filename)
-            object_url = response.url
+            if stored and (not renditions or stored.has_renditions(renditions)):
+                logger.info("File already uploaded: {}".format(stored.url))
 
-            logger.info("File uploaded successfully: {}".format(object_url))
+                if renditions:
+                    kwargs["renditions"] = stored.renditions
 
-            # delete file locally
-            os.remove(filename)
+                return f(main_url(stored.url, stored.renditions, renditions, original), *args, **kwargs)
 
-            return f(object_url, *args, **kwargs)
+            logger.info("Uploading file: {} ({} bytes)".format(
+                filename, secured_file["filesize"]))
 
-            # filename = secure_filename(file.filename)
+            # stream the spooled request file to ImageKit, nothing is written to the working directory
+            object_url = None
+            if stored:
+                object_url = stored.url
+            elif original:
+                object_url = upload_file(
+                    secured_file["file"], filename, secured_file["filetype"])["url"]
 
-            # # create the upload folder if it does not exist
-            # upload_folder = os.getenv("UPLOAD_FOLDER")
-            # os.makedirs(upload_folder, exist_ok=True)
+            if renditions:
+                kwargs["renditions"] = upload_renditions(
+                    secured_file["file"], filename, renditions)
 
-            # # append the random string to the end of the filename
-            # filename = f"{filename.rsplit('.', 1)[0]}_{random_string()}.{filename.rsplit('.', 1)[-1]}"
+                if not original and not kwargs["renditions"]:
+                    response_object["message"] = "Please provide a valid image."
+                    return jsonify(response_object), 400
 
-            # # save the file to the server
-            # file.save(os.path.join(upload_folder, filename))
+            object_url = main_url(object_url, kwargs.get("renditions"), renditions, original)
 
-            # # return the relative path to the file
-            # return f(
-            #     os.path.join(
-            #         os.getcwd(),
-            #         upload_folder,
-            #         filename
-            #     ), *args, **kwargs
-            # )
+        finally:
+            secured_file["file"].close()
+
+        logger.info("File uploaded successfully: {}".format(object_url))
+
+        save_upload(stored, secured_file, object_url, kwargs.get("renditions"))
+
+        return f(object_url, *args, **kwargs)
 
     return decorated_function
 
 
+def main_url(url: str, urls: dict, renditions: tuple, original: bool) -> str:
+    """
+    Url passed to the decorated function: the file itself, or its largest
+    rendition when the original is not to be served
+    """
+    if original or not renditions:
+        return url
+
+    return urls[str(max(renditions))]
+
+
+def save_upload(stored: Upload, secured_file: dict, url: str, renditions: dict = None):
+    """
+    Record an uploaded file in the content hash index
+    """
+    try:
+        if stored:
+            stored.update(renditions=renditions)
+        else:
+            Upload(
+                content_hash=secured_file["content_hash"],
+                url=url,
+                size=secured_file["filesize"],
+                type=secured_file["filetype"],
+                renditions=renditions
+            ).save()
+
+    except Exception as e:
+        # e.g. the same content recorded by a concurrent upload
+        db.session.rollback()
+        logger.error(e)
+
+
 def allowed_file(filename: str) -> bool:
     ALLOWED_EXTENSIONS = set([
         "pdf", "png", "jpg", "jpeg", "heic", "heif", "tiff", "tif", "gif", "svg"
@@ -4,19 +4,20 @@ from flask import Blueprint, jsonify, request
 
 from project import db
 from project.models import (
-    Role,
     User,
     Subscription,
     UserSubscription,
     Topic,
     Source,
     Keyword,
-    Article,
+    Job,
 )
 
-from project.api.authentications import authenticate
-from project.api.validators import field_type_validator, required_validator
-from project.api.utils import *
+from project.api.authentications import authenticate, current_user, is_admin
+from project.api.validators import field_type_validator
+from project.api.utils import TOPICS
+from project.api.jobs import submit_job
+from project.api.ingestion import ingest_articles
 
 user_blueprint = Blueprint("user", __name__, template_folder="templates")
 
@@ -30,9 +31,7 @@ def get_all_users(admin_id: int):
     response_object = {"status": False, "message": "Invalid payload."}
 
     try:
-        admin = User.query.filter_by(id=admin_id, role=Role.ADMIN).first()
-
-        if not admin:
+        if not is_admin():
             response_object["message"] = "Unauthorized access."
             return jsonify(response_object), 401
 
@@ -57,9 +56,7 @@ def get_single_user(admin_id: int, user_id: int):
     response_object = {"status": False, "message": "Invalid payload."}
 
     try:
-        admin = User.query.filter_by(id=admin_id, role=Role.ADMIN).first()
-
-        if not admin:
+        if not is_admin():
             response_object["message"] = "Unauthorized access."
             return jsonify(response_object), 401
 
@@ -77,6 +74,51 @@ def get_single_user(admin_id: int, user_id: int):
         return jsonify(response_object), 400
 
 
+@user_blueprint.route("/user/suspend/<user_id>", methods=["PATCH"])
+@authenticate
+def suspend_user(admin_id: int, user_id: int):
+    """
+    Suspend (or reinstate) a user:
+    - suspended: true to suspend (default), false to reinstate
+    Refresh and login fail at once; access tokens already issued keep
+    working until they expire (ACCESS_TOKEN_EXPIRATION_MINUTES).
+    """
+    response_object = {"status": False, "message": "Invalid payload."}
+
+    try:
+        if not is_admin():
+            response_object["message"] = "Unauthorized access."
+            return jsonify(response_object), 401
+
+        post_data = field_type_validator(request.get_json(silent=True) or {}, {"suspended": bool})
+        suspended = post_data.get("suspended")
+        suspended = True if suspended is None else suspended
+
+        user = User.query.filter_by(id=user_id).first()
+
+        if not user:
+            response_object["message"] = "User not found."
+            return jsonify(response_object), 404
+
+        if user.id == admin_id:
+            response_object["message"] = "You cannot suspend yourself."
+            return jsonify(response_object), 400
+
+        user.suspend(suspended)
+
+        response_object["status"] = True
+        response_object["message"] = "User suspended successfully." if suspended else "User reinstated successfully."
+        response_object["data"] = user.to_dict()
+
+        return jsonify(response_object), 200
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(e)
+        response_object["message"] = "Try again: " + str(e)
+        return jsonify(response_object), 400
+
+
 @user_blueprint.route("/user/get", methods=["GET"])
 @authenticate
 def get_user(user_id: int):
@@ -84,7 +126,7 @@ def get_user(user_id: int):
     response_object = {"status": False, "message": "Invalid payload."}
 
     try:
-        user = User.query.filter_by(id=user_id).first()
+        user = current_user()
 
         response_object["status"] = True
         response_object["message"] = "User retrieved successfully."
@@ -105,9 +147,7 @@ def find_user(user_id: int):
     response_object = {"status": False, "message": "Invalid payload."}
 
     try:
-        admin = User.query.filter_by(id=user_id, role=Role.ADMIN).first()
-
-        if not admin:
+        if not is_admin():
             response_object["message"] = "Unauthorized access."
             return jsonify(response_object), 401
 
@@ -161,6 +201,7 @@ def user_settings(user_id: int):
     - Topic
     - Source
     - Keyword
+    - Refresh ("incremental" by default, "full" to refetch every article)
     """
     response_object = {"status": False, "message": "Invalid payload."}
 
@@ -175,6 +216,7 @@ def user_settings(user_id: int):
             "topic": list,
             "source": list,
             "keyword": list,
+            "refresh": str,
         }
 
         post_data = field_type_validator(post_data, field_types)
@@ -184,6 +226,7 @@ def user_settings(user_id: int):
         topics = post_data.get("topic")
         sources = post_data.get("source")
         keywords = post_data.get("keyword")
+        incremental = str(post_data.get("refresh") or "incremental").lower() != "full"
 
         # is_changed = False
 
@@ -212,8 +255,9 @@ def user_settings(user_id: int):
 
             topics = [topic.lower() for topic in topics if topic.lower() in TOPICS]
 
-            for topic in topics:
-                Topic(user_id=user_id, name=topic).save()
+            Topic.bulk_save(
+                [Topic(user_id=user_id, name=topic) for topic in topics]
+            )
 
         if sources:
             # if Source.query.filter(
@@ -224,8 +268,9 @@ def user_settings(user_id: int):
 
             Source.query.filter_by(user_id=user_id).delete()
 
-            for source in sources:
-                Source(user_id=user_id, name=source).save()
+            Source.bulk_save(
+                [Source(user_id=user_id, name=source) for source in sources]
+            )
 
         if keywords:
             # if Keyword.query.filter(
@@ -238,47 +283,23 @@ def user_settings(user_id: int):
 
             keywords = [keyword.lower() for keyword in keywords]
 
-            for keyword in keywords:
-                Keyword(user_id=user_id, name=keyword).save()
+            Keyword.bulk_save(
+                [Keyword(user_id=user_id, name=keyword) for keyword in keywords]
+            )
 
         if keywords and topics and sources:
-            # remove all articles
-            Article.query.filter_by(user_id=user_id).delete()
-
-            for topic in topics:
-                # join all keywords with AND and place in quotes for multi-word
-                # keywords
-                keyword_str = " AND ".join(
-                    [
-                        f'"{keyword}"' if " " in keyword else keyword
-                        for keyword in keywords
-                    ]
-                )
+            # fetch articles in the background
+            job = Job(kind="ingestion", user_id=user_id)
+            job.save()
 
-                try:
-                    articles = get_news(q=keyword_str, topic=topic, sources=sources)
-                except Exception as e:
-                    logger.error(e)
-                    continue
-
-                if articles["status"] == "ok":
-                    for article in articles["articles"]:
-                        try:
-                            Article(
-                                user_id=user_id,
-                                title=article["title"],
-                                source=article["clean_url"],
-                                author=article["authors"],
-                                date=article["published_date"],
-                                summary=article["summary"],
-                                link=article["link"],
-                                image_url=article["media"],
-                                keywords=get_keywords(article["excerpt"]),
-                            ).save()
-                        
-                        except Exception as e:
-                            logger.error(e)
-                            continue
+            submit_job(job, ingest_articles, user_id, topics, sources, keywords,
+                       incremental=incremental)
+
+            response_object["status"] = True
+            response_object["message"] = "User settings updated successfully, articles are being fetched."
+            response_object["data"] = job.to_dict()
+
+            return jsonify(response_object), 202
 
         response_object["status"] = True
         response_object["message"] = "User settings updated successfully."
@@ -295,6 +316,31 @@ def user_settings(user_id: int):
         return jsonify(response_object), 400
 
 
+@user_blueprint.route("/user/setting/jobs/<job_id>", methods=["GET"])
+@authenticate
+def get_user_settings_job(user_id: int, job_id: int):
+    """Get status of a settings job"""
+    response_object = {"status": False, "message": "Invalid payload."}
+
+    try:
+        job = Job.query.filter_by(id=job_id, user_id=user_id).first()
+
+        if not job:
+            response_object["message"] = "Job not found."
+            return jsonify(response_object), 404
+
+        response_object["status"] = True
+        response_object["message"] = "Job retrieved successfully."
+        response_object["data"] = job.to_dict()
+
+        return jsonify(response_object), 200
+
+    except Exception as e:
+        logger.error(e)
+        response_object["message"] = "Try again: " + str(e)
+        return jsonify(response_object), 400
+
+
 @user_blueprint.route("/user/setting", methods=["GET"])
 @authenticate
 def get_user_settings(user_id: int):
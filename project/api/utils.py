@@ -1,10 +1,23 @@
 import os
+import re
+import time
+import hashlib
+import threading
 import yake
+import logging
 import openai
-from imagekitio.client import ImageKit
+import requests
+from flask import current_app
+from imagekitio.constants.url import URL as IMAGEKIT_URL
+from requests_toolbelt import MultipartEncoder
 from werkzeug.utils import secure_filename
-from newscatcherapi import NewsCatcherApiClient
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
+from project import metrics
+from project.exceptions import APIError, ServiceUnavailableError
+from project.cache import cached, make_cache
+
+logger = logging.getLogger(__name__)
 
 TOPICS = [
     "news", "sport", "tech", "world",
@@ -18,74 +31,265 @@ TOPICS = [
 ACCESS_PRIVATE_KEY = os.getenv('IMAGEKIT_PRIVATE_KEY')
 ACCESS_PUBLIC_KEY = os.getenv('IMAGEKIT_PUBLIC_KEY')
 ACCESS_URL_ENDPOINT = os.getenv('IMAGEKIT_URL_ENDPOINT')
+# seconds to connect to ImageKit and to wait for its answer to an upload
+IMAGEKIT_UPLOAD_TIMEOUT = (10, int(os.getenv('IMAGEKIT_UPLOAD_TIMEOUT', 120)))
 NEWSCATCHER_API_KEY = os.getenv('NEWSCATCHER_API_KEY')
+NEWSCATCHER_URL = os.getenv('NEWSCATCHER_URL', 'https://api.newscatcherapi.com/v2')
+# seconds to connect to NewsCatcher and to wait for its answer
+NEWSCATCHER_TIMEOUT = (5, int(os.getenv('NEWSCATCHER_TIMEOUT', 20)))
 OPEN_AI_API_KEY = os.getenv('OPEN_AI_API_KEY')
+# NewsCatcher response cache: memory (per process), sqlite (shared by workers) or none
+NEWS_CACHE_BACKEND = os.getenv('NEWS_CACHE_BACKEND', 'memory')
+NEWS_CACHE_PATH = os.getenv('NEWS_CACHE_PATH', 'news_cache.db')
+NEWS_CACHE_SIZE = int(os.getenv('NEWS_CACHE_SIZE', 1024))
+NEWS_CACHE_TTL = int(os.getenv('NEWS_CACHE_TTL', 900))
+SOURCES_CACHE_TTL = int(os.getenv('SOURCES_CACHE_TTL', 86400))
 
 
-# initialize ImageKit
-imagekit = ImageKit(
-    private_key=ACCESS_PRIVATE_KEY,
-    public_key=ACCESS_PUBLIC_KEY,
-    url_endpoint=ACCESS_URL_ENDPOINT
-)
+IMAGEKIT_UPLOAD_URL = "{}/api/v1/files/upload".format(IMAGEKIT_URL.UPLOAD_BASE_URL)
+
+
+class SizedReader(object):
+    """
+    Read-only view of a seekable file that reports the bytes left to read as
+    len, so MultipartEncoder streams it in chunks instead of copying it
+    """
+
+    def __init__(self, file, size: int):
+        self._file = file
+        self._size = size
 
+    @property
+    def len(self) -> int:
+        return self._size - self._file.tell()
 
-def upload_file(file: str, file_name: str) -> dict:
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+
+def upload_file(file, file_name: str, content_type: str = None) -> dict:
     """
-    Upload file to ImageKit
+    Upload file (a seekable binary file object) to ImageKit, streamed as
+    multipart in chunks. Returns the uploaded file details (url, fileId, ...)
     """
-    response = imagekit.upload_file(
-        file=file,
-        file_name=file_name
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(0)
+
+    body = MultipartEncoder(fields={
+        "file": (file_name, SizedReader(file, size), content_type or "application/octet-stream"),
+        "fileName": file_name,
+    })
+
+    response = requests.post(
+        IMAGEKIT_UPLOAD_URL,
+        data=body,
+        headers={"Content-Type": body.content_type},
+        auth=(ACCESS_PRIVATE_KEY or "", ""),
+        timeout=IMAGEKIT_UPLOAD_TIMEOUT
     )
 
-    return response
+    if response.status_code != 200:
+        logger.error("ImageKit upload failed ({}): {}".format(response.status_code, response.text))
+        raise ServiceUnavailableError("Could not upload file, please try again shortly.")
 
+    return response.json()
 
-def secure_file(file: str) -> dict:
+
+def secure_file(file, max_size: int, chunk_size: int = 64 * 1024) -> dict:
     """
-    Secure filename and get file info
+    Secure filename and hash the uploaded file in chunks. The file is not
+    copied: the request parser has already spooled it (in memory when small,
+    on disk past that). Raises APIError as soon as more than max_size bytes
+    have been read.
     """
     filename = secure_filename(file.filename)
     filetype = file.content_type
 
-    # save file locally
-    file.save(filename)
-    filesize = os.stat(filename).st_size
+    stream = file.stream
+    stream.seek(0)
+
+    content_hash = hashlib.sha256()
+    filesize = 0
+
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+
+        filesize += len(chunk)
+        if filesize > max_size:
+            raise APIError("File is too large, max size is {} bytes.".format(max_size))
+
+        content_hash.update(chunk)
+
+    stream.seek(0)
 
     return {
         "filename": filename,
         "filetype": filetype,
-        "filesize": filesize
+        "filesize": filesize,
+        "content_hash": content_hash.hexdigest(),
+        "file": stream
     }
 
 
-# initialize NewsCatcher API
-newscatcherapi = NewsCatcherApiClient(x_api_key=NEWSCATCHER_API_KEY)
+# NewsCatcher API, called directly: the client library sets no timeout
+newscatcher_session = requests.Session()
+newscatcher_session.headers["x-api-key"] = NEWSCATCHER_API_KEY or ""
 
+_news_executor = None
+_news_executor_lock = threading.Lock()
 
+# shared by every user, keyed by the query signature
+news_cache = make_cache(
+    backend=NEWS_CACHE_BACKEND,
+    default_ttl=NEWS_CACHE_TTL,
+    max_size=NEWS_CACHE_SIZE,
+    path=NEWS_CACHE_PATH
+)
+metrics.register("news_cache", news_cache.stats)
+
+
+def is_ok(response: dict) -> bool:
+    """
+    Whether a NewsCatcher response is a successful one, error and quota
+    answers are not cached
+    """
+    return isinstance(response, dict) and response.get("status") == "ok"
+
+
+@cached(news_cache, prefix="news_sources", ttl=SOURCES_CACHE_TTL, should_cache=is_ok)
 def get_news_sources(topic: str = None) -> dict:
     """
     Get news sources given a topic
     """
-    return newscatcherapi.get_sources(
-        topic=topic,
-        lang="en"
-    )
+    return newscatcher_get("sources", topic=topic, lang="en")
+
+
+def get_news(q: str, topic: str, sources: list, page: int = 1, limit: int = 100, from_: str = None) -> dict:
+    """
+    Get news given a query, topic, sources, page and limit,
+    optionally only news published since from_ ("%Y/%m/%d %H:%M:%S")
+    """
+    # same sources in any order is the same query
+    if isinstance(sources, (list, tuple, set)):
+        sources = sorted(sources)
+
+    return search_news(q=q, topic=topic, sources=sources, page=page, limit=limit, from_=from_)
 
 
-def get_news(q: str, topic: str, sources: list, page: int = 1, limit: int = 100) -> dict:
+@cached(news_cache, prefix="news_search", should_cache=is_ok)
+def search_news(q: str, topic: str, sources: list, page: int = 1, limit: int = 100, from_: str = None) -> dict:
     """
-    Get news given a query, topic, sources, page and limit
+    Search NewsCatcher (cached)
     """
-    return newscatcherapi.get_search(
+    return newscatcher_get(
+        "search",
         q=q,
         topic=topic,
         sources=sources,
         page=page,
-        page_size=limit
+        page_size=limit,
+        **{"from": from_}
+    )
+
+
+def newscatcher_get(endpoint: str, **params) -> dict:
+    """
+    Call a NewsCatcher endpoint, with a connect and read timeout.
+    Errors of the API come back as {"status": "error", "message": ...}
+    """
+    params = {
+        key: ",".join(value) if isinstance(value, (list, tuple)) else value
+        for key, value in params.items()
+        if value is not None
+    }
+
+    response = newscatcher_session.get(
+        "{}/{}".format(NEWSCATCHER_URL, endpoint),
+        params=params,
+        timeout=NEWSCATCHER_TIMEOUT
     )
 
+    try:
+        return response.json()
+    except ValueError:
+        return {"status": "error", "message": response.reason or "Invalid response."}
+
+
+def get_news_executor() -> ThreadPoolExecutor:
+    """
+    Get (or lazily create) the executor shared by every news fetch of the
+    process, so requests in flight never exceed NEWS_FETCH_CONCURRENCY
+    """
+    global _news_executor
+
+    if _news_executor is None:
+        with _news_executor_lock:
+            if _news_executor is None:
+                _news_executor = ThreadPoolExecutor(
+                    max_workers=current_app.config.get("NEWS_FETCH_CONCURRENCY"),
+                    thread_name_prefix="news"
+                )
+
+    return _news_executor
+
+
+def get_news_by_topic(q: str, topics: list, sources: list, timeout: float = 30,
+                      topic_kwargs: dict = None, on_result=None, **kwargs) -> dict:
+    """
+    Get news for every topic at once on the shared news executor.
+    topic_kwargs maps a topic to extra get_news arguments for that topic only.
+    Each request gets timeout seconds from the moment it starts.
+    on_result(topic, response) is called in the calling thread as soon as
+    each topic is done. Returns a response per topic; failed or timed out
+    topics get {"status": "error", "message": ...} instead of raising.
+    """
+    topic_kwargs = topic_kwargs or {}
+    results = {}
+    started = {}
+
+    def fetch(topic):
+        started[topic] = time.monotonic()
+        return get_news(q=q, topic=topic, sources=sources, **dict(kwargs, **topic_kwargs.get(topic, {})))
+
+    executor = get_news_executor()
+    futures = {executor.submit(fetch, topic): topic for topic in topics}
+    pending = set(futures)
+
+    while pending:
+        # wake up when a request finishes or the first running one times out;
+        # requests still queued behind other fetches have not started their clock
+        deadlines = [started[futures[future]] + timeout for future in pending if futures[future] in started]
+        wait_for = max(0, min(deadlines) - time.monotonic()) if deadlines else timeout
+        done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            topic = futures[future]
+            try:
+                results[topic] = future.result()
+            except Exception as e:
+                logger.error(e)
+                results[topic] = {"status": "error", "message": str(e)}
+
+            if on_result:
+                on_result(topic, results[topic])
+
+        now = time.monotonic()
+        for future in list(pending):
+            topic = futures[future]
+            if topic in started and now - started[topic] >= timeout:
+                # the HTTP timeout ends the request itself shortly
+                pending.discard(future)
+                logger.error("News request for topic {} timed out".format(topic))
+                results[topic] = {"status": "error", "message": "Request timed out."}
+
+                if on_result:
+                    on_result(topic, results[topic])
+
+    return results
+
 
 # Not required anymore
 
@@ -104,20 +308,136 @@ def get_keywords(text: str, max_keywords: int = 10):
 openai.api_key = OPEN_AI_API_KEY
 
 
+def bullet_points_messages(text: str, max_bullet_points: int = 5) -> list:
+    """
+    Chat messages asking for bullet points of text
+    """
+    return [
+        {
+            "role": "user",
+            "content": "Please turn this article into {0} bullet points:\n\n{1}".format(
+                max_bullet_points, text
+            )
+        }
+    ]
+
+
 def get_bullet_points(text: str, max_bullet_points: int = 5) -> str:
     """
     Get bullet points from text
     """
     response = openai.ChatCompletion.create(
         model="gpt-3.5-turbo",
-        messages=[
-            {
-                "role": "user",
-                "content": "Please turn this article into {0} bullet points:\n\n{1}".format(
-                    max_bullet_points, text
-                )
-            }
-        ],
+        messages=bullet_points_messages(text, max_bullet_points),
     )
 
     return response.choices[0].message.content
+
+
+# errors worth retrying the same request after a pause
+RATE_LIMIT_ERRORS = (openai.error.RateLimitError, openai.error.ServiceUnavailableError)
+
+ARTICLE_HEADER = re.compile(r"^[#*\s]*Article\s+(\d+)\s*[:.]?[#*\s]*$", flags=re.IGNORECASE | re.MULTILINE)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count of English text (about 4 characters per token)
+    """
+    return len(text) // 4 + 1
+
+
+def bullet_points_batch_messages(texts: list, max_bullet_points: int = 5) -> list:
+    """
+    Chat messages asking for bullet points of every text, each answer
+    under a "### Article <number>" header
+    """
+    articles = "\n\n".join(
+        "### Article {0}\n{1}".format(number, text)
+        for number, text in enumerate(texts, start=1)
+    )
+
+    return [
+        {
+            "role": "user",
+            "content": (
+                "Please turn each of the following {0} articles into {1} bullet points. "
+                "Start the bullet points of each article with a line \"### Article <number>\", "
+                "in the same order:\n\n{2}"
+            ).format(len(texts), max_bullet_points, articles)
+        }
+    ]
+
+
+def parse_bullet_points_batch(content: str, count: int) -> list:
+    """
+    Split a batch answer into the bullet points of each article,
+    None for articles missing from the answer
+    """
+    results = [None] * count
+    parts = ARTICLE_HEADER.split(content)
+
+    # [preamble, number, bullet points, number, bullet points, ...]
+    for number, bullet_points in zip(parts[1::2], parts[2::2]):
+        index = int(number) - 1
+        if 0 <= index < count and results[index] is None and bullet_points.strip():
+            results[index] = bullet_points.strip()
+
+    return results
+
+
+def get_bullet_points_batch(texts: list, max_bullet_points: int = 5) -> list:
+    """
+    Get bullet points from several texts in a single request
+    """
+    if len(texts) == 1:
+        return [get_bullet_points(texts[0], max_bullet_points)]
+
+    response = openai.ChatCompletion.create(
+        model="gpt-3.5-turbo",
+        messages=bullet_points_batch_messages(texts, max_bullet_points),
+    )
+
+    return parse_bullet_points_batch(response.choices[0].message.content, len(texts))
+
+
+def pack_batches(texts: list, token_budget: int, max_batch_size: int, output_tokens: int = 0) -> list:
+    """
+    Group texts, in order, into batches of at most max_batch_size texts whose
+    estimated prompt and answer (output_tokens per text) fit token_budget.
+    A text over the budget on its own gets a batch of its own.
+    Returns lists of indexes into texts.
+    """
+    batches = []
+    batch, used = [], 0
+
+    for index, text in enumerate(texts):
+        cost = estimate_tokens(text) + output_tokens
+
+        if batch and (used + cost > token_budget or len(batch) >= max_batch_size):
+            batches.append(batch)
+            batch, used = [], 0
+
+        batch.append(index)
+        used += cost
+
+    if batch:
+        batches.append(batch)
+
+    return batches
+
+
+def stream_bullet_points(text: str, max_bullet_points: int = 5):
+    """
+    Get bullet points from text, yielding pieces of text as the model writes them
+    """
+    response = openai.ChatCompletion.create(
+        model="gpt-3.5-turbo",
+        messages=bullet_points_messages(text, max_bullet_points),
+        stream=True,
+    )
+
+    for chunk in response:
+        content = chunk.choices[0].delta.get("content")
+        if content:
+            yield content
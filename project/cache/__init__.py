@@ -0,0 +1,2 @@
+from .backends import BaseCache, MemoryCache, SQLiteCache, NullCache, make_cache
+from .decorators import cached, make_key
@@ -0,0 +1,229 @@
+import time
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class BaseCache(object):
+    """
+    Base cache backend:
+    - default_ttl: seconds an entry lives unless set() is given a ttl (None = forever)
+    - max_size: max number of entries before the least recently used are evicted
+    """
+
+    def __init__(self, default_ttl: float = None, max_size: int = 1024):
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str, default=None):
+        raise NotImplementedError
+
+    def set(self, key: str, value, ttl: float = None):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def expires_at(self, ttl: float = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        return time.time() + ttl if ttl is not None else None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.__class__.__name__,
+            "size": len(self),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class NullCache(BaseCache):
+    """
+    Cache backend that never stores anything
+    """
+
+    def get(self, key: str, default=None):
+        self.misses += 1
+        return default
+
+    def set(self, key: str, value, ttl: float = None):
+        pass
+
+    def delete(self, key: str):
+        pass
+
+    def clear(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class MemoryCache(BaseCache):
+    """
+    In-process LRU cache with per-entry expiry, safe to share between threads
+    """
+
+    def __init__(self, default_ttl: float = None, max_size: int = 1024):
+        super().__init__(default_ttl=default_ttl, max_size=max_size)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+
+            if entry is not None:
+                value, expires_at = entry
+
+                if expires_at is None or expires_at > time.time():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+
+                del self._data[key]
+
+            self.misses += 1
+            return default
+
+    def set(self, key: str, value, ttl: float = None):
+        with self._lock:
+            self._data[key] = (value, self.expires_at(ttl))
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        now = time.time()
+        with self._lock:
+            return sum(
+                1 for _, expires_at in self._data.values()
+                if expires_at is None or expires_at > now
+            )
+
+
+class SQLiteCache(BaseCache):
+    """
+    Cache stored in a SQLite file, shared by every process on the host
+    (e.g. all gunicorn workers). Values are pickled.
+    """
+
+    def __init__(self, path: str, default_ttl: float = None, max_size: int = 1024):
+        super().__init__(default_ttl=default_ttl, max_size=max_size)
+        self.path = path
+        self._local = threading.local()
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB, expires_at REAL, accessed_at REAL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_cache_accessed_at ON cache (accessed_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+
+        return conn
+
+    def get(self, key: str, default=None):
+        now = time.time()
+
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is not None:
+                value, expires_at = row
+
+                if expires_at is None or expires_at > now:
+                    conn.execute(
+                        "UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+                    self.hits += 1
+                    return pickle.loads(value)
+
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+        self.misses += 1
+        return default
+
+    def set(self, key: str, value, ttl: float = None):
+        now = time.time()
+
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, pickle.dumps(value), self.expires_at(ttl), now)
+            )
+
+            # drop expired entries, then the least recently used overflow
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+            evicted = conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_size,)
+            ).rowcount
+            self.evictions += max(evicted, 0)
+
+    def delete(self, key: str):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM cache")
+
+    def __len__(self):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM cache WHERE expires_at IS NULL OR expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+
+
+def make_cache(backend: str = "memory", default_ttl: float = None, max_size: int = 1024, path: str = None) -> BaseCache:
+    """
+    Create a cache backend by name: memory, sqlite or none
+    """
+    backend = (backend or "memory").lower()
+
+    if backend == "memory":
+        return MemoryCache(default_ttl=default_ttl, max_size=max_size)
+
+    if backend == "sqlite":
+        return SQLiteCache(path=path, default_ttl=default_ttl, max_size=max_size)
+
+    if backend == "none":
+        return NullCache(default_ttl=default_ttl, max_size=max_size)
+
+    raise ValueError("Unknown cache backend: {}".format(backend))
@@ -0,0 +1,43 @@
+import json
+import hashlib
+from functools import wraps
+
+from project.cache.backends import BaseCache
+
+_missing = object()
+
+
+def make_key(prefix: str, *args, **kwargs) -> str:
+    """
+    Build a stable cache key from a prefix and call arguments
+    """
+    signature = json.dumps([args, kwargs], sort_keys=True, default=str)
+    return "{}:{}".format(prefix, hashlib.sha256(signature.encode("utf-8")).hexdigest())
+
+
+def cached(cache: BaseCache, prefix: str = None, ttl: float = None, should_cache=None):
+    """
+    Decorator to memoize a function's results in the given cache,
+    keyed by its arguments. Exceptions are never cached, nor results
+    for which should_cache(result) is false.
+    """
+    def decorator(f):
+        key_prefix = prefix or "{}.{}".format(f.__module__, f.__name__)
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            key = make_key(key_prefix, *args, **kwargs)
+
+            value = cache.get(key, _missing)
+            if value is _missing:
+                value = f(*args, **kwargs)
+                if should_cache is None or should_cache(value):
+                    cache.set(key, value, ttl=ttl)
+
+            return value
+
+        decorated_function.cache = cache
+        decorated_function.uncached = f
+        return decorated_function
+
+    return decorator
@@ -42,5 +42,86 @@ class Config:
     DEBUG_TB_ENABLED = False
     DEBUG_TB_INTERCEPT_REDIRECTS = False
     BCRYPT_LOG_ROUNDS = 13
+    # bcrypt worker pool: threads, extra queued calls, reject when full
+    # instead of waiting, and max seconds to wait for a slot or a result
+    BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", 2))
+    BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", 16))
+    BCRYPT_FAST_FAIL = bool(int(os.getenv("BCRYPT_FAST_FAIL", 1)))
+    BCRYPT_TIMEOUT = float(os.getenv("BCRYPT_TIMEOUT", 10))
+    # refresh token lifetime
     TOKEN_EXPIRATION_DAYS = 30
     TOKEN_EXPIRATION_SECONDS = 0
+    # access token lifetime, also the longest a suspension takes to apply
+    ACCESS_TOKEN_EXPIRATION_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRATION_MINUTES", 15))
+    # seconds between reloads of tokens blacklisted by other workers
+    BLACKLIST_RESYNC_SECONDS = int(os.getenv("BLACKLIST_RESYNC_SECONDS", 30))
+    # revocations are read again this many seconds back at every reload, so
+    # ones that commit late (or come from a worker with a skewed clock) are not missed
+    BLACKLIST_RESYNC_OVERLAP_SECONDS = int(os.getenv("BLACKLIST_RESYNC_OVERLAP_SECONDS", 300))
+    # uploads larger than this are rejected while streaming, and requests
+    # larger than this (plus form overhead) before they are read at all
+    MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", 10 * 1024 * 1024))
+    MAX_CONTENT_LENGTH = MAX_UPLOAD_SIZE + 64 * 1024
+    # start method of worker processes: spawn or forkserver, never fork
+    # (forking a multi-threaded server process can deadlock the child)
+    PROCESS_START_METHOD = os.getenv("PROCESS_START_METHOD", "spawn")
+    # image rendition process pool, output format (falls back to JPEG)
+    # and max seconds to wait for the renditions of one upload
+    IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+    IMAGE_RENDITION_FORMAT = os.getenv("IMAGE_RENDITION_FORMAT", "WEBP")
+    IMAGE_TIMEOUT = float(os.getenv("IMAGE_TIMEOUT", 30))
+    # keyword extraction process pool, excerpts per batch and max seconds to
+    # wait for the keywords of one ingestion (excerpts not done get none)
+    KEYWORD_WORKERS = int(os.getenv("KEYWORD_WORKERS", 2))
+    KEYWORD_BATCH_SIZE = int(os.getenv("KEYWORD_BATCH_SIZE", 16))
+    KEYWORD_TIMEOUT = float(os.getenv("KEYWORD_TIMEOUT", 60))
+    # max articles per page of the cursor feed, larger limits are capped
+    FEED_MAX_LIMIT = int(os.getenv("FEED_MAX_LIMIT", 100))
+    # number of background worker threads running ingestion jobs
+    INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", 4))
+    # seconds without any update after which a queued or running job is
+    # reported as failed (its worker process died)
+    JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", 900))
+    # max concurrent NewsCatcher requests per worker process, and seconds
+    # to wait for one once it has started
+    NEWS_FETCH_CONCURRENCY = int(os.getenv("NEWS_FETCH_CONCURRENCY", 8))
+    NEWS_FETCH_TIMEOUT = float(os.getenv("NEWS_FETCH_TIMEOUT", 30))
+    # bullet points per article summary, and whether ingestion summarizes
+    # new articles in the background (with which engine) instead of on their first read
+    SUMMARY_BULLET_POINTS = int(os.getenv("SUMMARY_BULLET_POINTS", 5))
+    SUMMARIZE_ON_INGEST = bool(int(os.getenv("SUMMARIZE_ON_INGEST", 0)))
+    SUMMARY_INGEST_ENGINE = os.getenv("SUMMARY_INGEST_ENGINE", "local")
+    # default summary engine (auto, openai or local), seconds auto waits for
+    # OpenAI before answering with a local summary, and threads calling OpenAI
+    SUMMARY_ENGINE = os.getenv("SUMMARY_ENGINE", "auto")
+    SUMMARY_DEADLINE = float(os.getenv("SUMMARY_DEADLINE", 3))
+    # seconds auto reads of an article stay local after OpenAI failed or missed the deadline for it
+    SUMMARY_RETRY_SECONDS = int(os.getenv("SUMMARY_RETRY_SECONDS", 300))
+    SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", 4))
+    # articles packed into one OpenAI request: estimated prompt and answer
+    # tokens, articles per request, and requests in flight per batch run
+    SUMMARY_BATCH_TOKENS = int(os.getenv("SUMMARY_BATCH_TOKENS", 3000))
+    SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", 8))
+    SUMMARY_BATCH_CONCURRENCY = int(os.getenv("SUMMARY_BATCH_CONCURRENCY", 4))
+    # OpenAI rate limits shared by every request of a worker process
+    OPENAI_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", 60))
+    OPENAI_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", 90000))
+    # max seconds a request waits for its share of those limits before
+    # failing; background batches wait as long as needed
+    OPENAI_RATE_LIMIT_WAIT = float(os.getenv("OPENAI_RATE_LIMIT_WAIT", 2))
+    # seconds before a worker reloads the source catalog from the database,
+    # and before the catalog itself is refreshed from NewsCatcher
+    SOURCE_CATALOG_RELOAD_SECONDS = int(os.getenv("SOURCE_CATALOG_RELOAD_SECONDS", 300))
+    SOURCE_CATALOG_REFRESH_SECONDS = int(os.getenv("SOURCE_CATALOG_REFRESH_SECONDS", 86400))
+    # minimum seconds between two refreshes of the source catalog, failed or not
+    SOURCE_CATALOG_RETRY_SECONDS = int(os.getenv("SOURCE_CATALOG_RETRY_SECONDS", 300))
+
+
+class TestingConfig(Config):
+    """Testing configuration"""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_TEST_URL", "sqlite:///test.db")
+    BCRYPT_LOG_ROUNDS = 4
+    # one worker per process pool is plenty for the tests
+    IMAGE_WORKERS = 1
+    KEYWORD_WORKERS = 1
@@ -2,7 +2,7 @@ import logging
 import traceback
 
 from flask import jsonify, request
-from project.exceptions import APIError
+from project.exceptions import APIError, ServiceUnavailableError
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -11,6 +11,14 @@ logger.setLevel(logging.DEBUG)
 def handle_exception(ex):
     """Error handler to handle unhandled exceptions."""
 
+    if isinstance(ex, ServiceUnavailableError):
+        response_data = {
+            "status": False,
+            "message": str(ex)
+        }
+
+        return jsonify(response_data), 503
+
     if isinstance(ex, APIError):
         response_data = {
             "status": False,
@@ -19,6 +27,14 @@ def handle_exception(ex):
 
         return jsonify(response_data), 400
 
+    if hasattr(ex, 'code') and ex.code == 413:
+
+        response_data = {
+            "status": False,
+            "message": "Request is too large"
+        }
+        return jsonify(response_data), 413
+
     if hasattr(ex, 'code') and ex.code == 404:
 
         response_data = {
@@ -0,0 +1,123 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from flask import current_app
+
+from project import bcrypt, metrics
+from project.exceptions import ServiceUnavailableError
+
+"""
+    Bounded worker pool for bcrypt.
+
+    Hashing runs on a small dedicated executor (bcrypt releases the GIL) so a
+    burst of logins cannot tie up every request thread. At most
+    BCRYPT_WORKERS + BCRYPT_MAX_QUEUE calls are admitted; past that, callers
+    either fail fast with ServiceUnavailableError or wait for a slot. A call
+    given up on after BCRYPT_TIMEOUT keeps its slot until bcrypt is done.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class HashingPool(object):
+    """
+    Size-limited executor for password hashing with queue-depth counters
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self.depth = 0
+        self.max_depth = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _setup(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    config = current_app.config
+                    workers = config.get("BCRYPT_WORKERS")
+                    self.capacity = workers + config.get("BCRYPT_MAX_QUEUE")
+                    self.fast_fail = config.get("BCRYPT_FAST_FAIL")
+                    self.timeout = config.get("BCRYPT_TIMEOUT")
+                    self._slots = threading.BoundedSemaphore(self.capacity)
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=workers, thread_name_prefix="bcrypt")
+
+    def run(self, func, *args):
+        """
+        Run func(*args) on the pool and wait for its result
+        """
+        self._setup()
+
+        if not self._slots.acquire(blocking=not self.fast_fail, timeout=None if self.fast_fail else self.timeout):
+            self.rejected += 1
+            raise ServiceUnavailableError("Server is busy, please try again shortly.")
+
+        with self._lock:
+            self.depth += 1
+            self.max_depth = max(self.max_depth, self.depth)
+
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._release()
+            raise
+
+        # the slot is only free once the work is, not when the caller stops waiting
+        future.add_done_callback(self._release)
+
+        try:
+            return future.result(timeout=self.timeout)
+
+        except FutureTimeoutError:
+            with self._lock:
+                self.rejected += 1
+            raise ServiceUnavailableError("Server is busy, please try again shortly.")
+
+    def _release(self, future=None):
+        with self._lock:
+            self.depth -= 1
+            self.completed += 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "capacity": getattr(self, "capacity", None),
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+hashing_pool = HashingPool()
+metrics.register("bcrypt_pool", hashing_pool.stats)
+
+
+def hash_password(password: str, rounds: int) -> str:
+    """
+    Hash password with the given cost factor
+    """
+    return hashing_pool.run(
+        bcrypt.generate_password_hash, password, rounds).decode("utf-8")
+
+
+def check_password(password_hash: str, password: str) -> bool:
+    """
+    Check password against a bcrypt hash
+    """
+    return hashing_pool.run(
+        bcrypt.check_password_hash, password_hash, password.encode("utf-8"))
+
+
+def hash_rounds(password_hash: str) -> int:
+    """
+    Cost factor a bcrypt hash was made with ($2b$<rounds>$...)
+    """
+    try:
+        return int(password_hash.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
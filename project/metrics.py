@@ -0,0 +1,40 @@
+import logging
+import threading
+
+"""
+    Process-local metrics registry.
+
+    Subsystems register a collector (a callable returning a dict of counters)
+    under a name, and the admin metrics endpoint reports a snapshot of all of them.
+"""
+
+logger = logging.getLogger(__name__)
+
+_collectors = {}
+_lock = threading.Lock()
+
+
+def register(name: str, collector):
+    """
+    Register a collector under the given name
+    """
+    with _lock:
+        _collectors[name] = collector
+
+
+def snapshot() -> dict:
+    """
+    Collect the current value of every registered collector
+    """
+    with _lock:
+        collectors = dict(_collectors)
+
+    data = {}
+    for name, collector in collectors.items():
+        try:
+            data[name] = collector()
+        except Exception as e:
+            logger.error(e)
+            data[name] = {"error": str(e)}
+
+    return data
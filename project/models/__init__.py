@@ -1,3 +1,6 @@
 from .customary_model import CommonModel, SurrogatePK
 from .user_model import User, Role, Subscription, UserSubscription, BlacklistToken
-from .article_model import Article, Keyword, Source, Topic
+from .article_model import Article, ArticleKeyword, UserArticle, UserArticleSignature, Keyword, Source, Topic, CatalogSource, Summary
+from .job_model import Job, JobStatus
+from .search import search_articles, rebuild_search_index
+from .upload_model import Upload
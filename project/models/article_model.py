@@ -1,22 +1,24 @@
+import hashlib
 from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
 from project import db
 from project.models.user_model import User, CommonModel, SurrogatePK
 
 class Article(CommonModel, SurrogatePK):
     """
-    Article model:
+    Article model (shared by every user, see UserArticle for feeds):
     - title: title of the article
     - slug: slug of the article (title in lowercase and with dashes)
     - source: source of the article
     - author: author of the article
     - date: date of the article
     - summary: summary of the article
-    - keywords: keywords of the article (comma separated)
     - link: link of the article
     - image_url: image url of the article
+    - content_hash: hash of the canonical link, one article per hash
 
-    - user_id: id of the user who created the article
+    - article_keywords: keywords of the article
     """
     __tablename__ = "articles"
 
@@ -28,17 +30,23 @@ class Article(CommonModel, SurrogatePK):
     summary = db.Column(db.Text, nullable=True)
     link = db.Column(db.String(256), nullable=True)
     image_url = db.Column(db.String(256), nullable=True)
-    keywords = db.Column(db.Text, nullable=True)
+    content_hash = db.Column(db.String(64), unique=True, nullable=False)
 
-    user_id = db.Column(db.Integer, db.ForeignKey(User.id), nullable=False)
+    article_keywords = db.relationship(
+        "ArticleKeyword",
+        order_by="ArticleKeyword.position",
+        cascade="all, delete-orphan",
+        lazy="selectin"
+    )
 
-    def __init__(self, title: str, source: str, author: str, date: datetime, keywords: str, user_id: int, **kwargs):
+    def __init__(self, title: str, source: str, author: str, date: datetime, keywords: list, **kwargs):
         slug = title.lower().replace(" ", "-")
         # convert date to datetime object
         date = datetime.strptime(date, "%Y-%m-%d %H:%M:%S")
-        keywords = str(keywords) if keywords else None
-        db.Model.__init__(self, title=title, slug=slug, source=source,
-                          author=author, date=date, keywords=keywords, user_id=user_id, **kwargs)
+        content_hash = kwargs.pop("content_hash", None) or self.hash_link(kwargs.get("link") or title)
+        db.Model.__init__(self, title=title, slug=slug, source=source, author=author,
+                          date=date, content_hash=content_hash, **kwargs)
+        self.set_keywords(keywords or [])
 
     def __repr__(self):
         return "<Article | {0} | {1} >".format(self.title, self.source)
@@ -46,13 +54,94 @@ class Article(CommonModel, SurrogatePK):
     def __str__(self):
         return self.title
 
+    @staticmethod
+    def canonical_link(link: str) -> str:
+        """
+        Canonical form of a link: lowercase scheme and host, no fragment,
+        no tracking parameters and no trailing slash
+        """
+        parts = urlsplit(link.strip())
+        query = urlencode([
+            (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith("utm_")
+        ])
+        return urlunsplit((
+            parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), query, ""
+        ))
+
+    @staticmethod
+    def hash_link(link: str) -> str:
+        return hashlib.sha256(Article.canonical_link(link).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def for_user(user_id: int):
+        """
+        Query of the articles in the user's feed
+        """
+        return Article.query.join(
+            UserArticle, UserArticle.article_id == Article.id
+        ).filter(UserArticle.user_id == user_id)
+
+    @staticmethod
+    def feed(user_id: int):
+        """
+        Query of the articles in the user's feed, newest first
+        """
+        return Article.for_user(user_id).order_by(
+            UserArticle.date.desc(), UserArticle.article_id.desc())
+
+    def set_keywords(self, keywords: list):
+        """
+        Replace the keywords of the article, keeping their order
+        """
+        rows = []
+        seen = set()
+        for keyword in keywords:
+            normalized = keyword.strip().lower()
+            if normalized and normalized not in seen:
+                seen.add(normalized)
+                rows.append(ArticleKeyword(keyword=keyword.strip(), position=len(rows)))
+
+        self.article_keywords = rows
+
     def get_keywords(self):
-        return eval(self.keywords) if self.keywords else []
+        return [row.keyword for row in self.article_keywords]
 
-    def to_dict(self):
+    @staticmethod
+    def prune_orphans(article_ids: list = None, batch_size: int = 1000) -> int:
+        """
+        Delete articles that are in no feed anymore (only among article_ids
+        when given), with their keywords and summaries, in batches
+        """
+        query = Article.query.with_entities(Article.id, Article.content_hash).filter(
+            ~db.exists().where(UserArticle.article_id == Article.id)
+        )
+        if article_ids is not None:
+            query = query.filter(Article.id.in_(article_ids))
+
+        deleted = 0
+
+        while True:
+            rows = query.limit(batch_size).all()
+
+            if not rows:
+                break
+
+            ids = [id for id, _ in rows]
+            ArticleKeyword.query.filter(ArticleKeyword.article_id.in_(ids)).delete(
+                synchronize_session=False)
+            Summary.query.filter(Summary.content_hash.in_([content_hash for _, content_hash in rows])).delete(
+                synchronize_session=False)
+            Article.query.filter(Article.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+            deleted += len(ids)
+
+        return deleted
+
+    def to_dict(self, user_id: int = None):
         return {
             "id": self.id,
-            "user_id": self.user_id,
+            "user_id": user_id,
             "title": self.title,
             "slug": self.slug,
             "source": self.source,
@@ -61,12 +150,101 @@ class Article(CommonModel, SurrogatePK):
             "summary": self.summary,
             "link": self.link,
             "image_url": self.image_url,
-            "keywords": eval(self.keywords) if self.keywords else [],
+            "keywords": self.get_keywords(),
             "created_at": self.created_at.strftime("%Y-%m-%d %H:%M:%S"),
             "updated_at": self.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
         }
 
 
+class ArticleKeyword(CommonModel, SurrogatePK):
+    """
+    ArticleKeyword model:
+    - keyword: keyword as extracted
+    - normalized: lowercased keyword, used for lookups
+    - position: rank of the keyword within the article
+
+    - article_id: id of the article
+    """
+    __tablename__ = "article_keywords"
+    __table_args__ = (
+        db.UniqueConstraint("article_id", "normalized", name="uq_article_keywords_article_normalized"),
+        db.Index("ix_article_keywords_normalized_article", "normalized", "article_id"),
+        {"extend_existing": True},
+    )
+
+    keyword = db.Column(db.String(256), nullable=False)
+    normalized = db.Column(db.String(256), nullable=False)
+    position = db.Column(db.Integer, default=0)
+
+    article_id = db.Column(db.Integer, db.ForeignKey(Article.id, ondelete="CASCADE"), nullable=False)
+
+    def __init__(self, keyword: str, position: int = 0, **kwargs):
+        db.Model.__init__(self, keyword=keyword, normalized=keyword.lower(),
+                          position=position, **kwargs)
+
+    def __repr__(self):
+        return "<ArticleKeyword | {0} | {1} >".format(self.article_id, self.keyword)
+
+    def __str__(self):
+        return self.keyword
+
+
+class UserArticle(CommonModel, SurrogatePK):
+    """
+    UserArticle model (membership of an article in a user's feed):
+    - date: date of the article (copied for feed ordering)
+
+    - user_id: id of the user
+    - article_id: id of the article
+
+    - signatures: settings queries that fetched the article, see UserArticleSignature
+    """
+    __tablename__ = "user_articles"
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "article_id", name="uq_user_articles_user_article"),
+        db.Index("ix_user_articles_user_date_article", "user_id", "date", "article_id"),
+        {"extend_existing": True},
+    )
+
+    date = db.Column(db.DateTime, nullable=False)
+
+    user_id = db.Column(db.Integer, db.ForeignKey(User.id), nullable=False)
+    article_id = db.Column(db.Integer, db.ForeignKey(Article.id), nullable=False, index=True)
+
+    def __init__(self, user_id: int, article_id: int, date: datetime, **kwargs):
+        db.Model.__init__(self, user_id=user_id, article_id=article_id, date=date, **kwargs)
+
+    def __repr__(self):
+        return "<UserArticle | {0} | {1} >".format(self.user_id, self.article_id)
+
+
+class UserArticleSignature(CommonModel, SurrogatePK):
+    """
+    UserArticleSignature model (why an article is in a user's feed, one row
+    per settings query that fetched it, so pruning a query keeps the article
+    as long as another query still matches it):
+    - signature: signature of the settings query (topic, keywords, sources)
+
+    - user_article_id: id of the feed membership
+    """
+    __tablename__ = "user_article_signatures"
+    __table_args__ = (
+        db.UniqueConstraint("user_article_id", "signature", name="uq_user_article_signatures_membership_signature"),
+        db.Index("ix_user_article_signatures_signature_membership", "signature", "user_article_id"),
+        {"extend_existing": True},
+    )
+
+    signature = db.Column(db.String(64), nullable=False)
+
+    user_article_id = db.Column(db.Integer, db.ForeignKey(UserArticle.id, ondelete="CASCADE"), nullable=False)
+
+    def __init__(self, user_article_id: int, signature: str, **kwargs):
+        db.Model.__init__(self, user_article_id=user_article_id, signature=signature, **kwargs)
+
+    def __repr__(self):
+        return "<UserArticleSignature | {0} | {1} >".format(self.user_article_id, self.signature)
+
+
 class Keyword(CommonModel, SurrogatePK):
     """
     Keyword model:
@@ -155,3 +333,58 @@ class Topic(CommonModel, SurrogatePK):
             "created_at": self.created_at.strftime("%Y-%m-%d %H:%M:%S"),
             "updated_at": self.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
         }
+
+
+class CatalogSource(CommonModel, SurrogatePK):
+    """
+    CatalogSource model (local copy of the NewsCatcher source catalog):
+    - topic: topic the source publishes under
+    - name: name (domain) of the source
+    """
+    __tablename__ = "source_catalog"
+    __table_args__ = (
+        db.UniqueConstraint("topic", "name", name="uq_source_catalog_topic_name"),
+        {"extend_existing": True},
+    )
+
+    topic = db.Column(db.String(64), nullable=False, index=True)
+    name = db.Column(db.String(256), nullable=False)
+
+    def __init__(self, topic: str, name: str, **kwargs):
+        db.Model.__init__(self, topic=topic, name=name, **kwargs)
+
+    def __repr__(self):
+        return "<CatalogSource | {0} | {1} >".format(self.topic, self.name)
+
+    def __str__(self):
+        return self.name
+
+
+class Summary(CommonModel, SurrogatePK):
+    """
+    Summary model (bullet points of an article, shared by every feed it is in):
+    - content_hash: content hash of the summarized article
+    - bullets: bullet points of the article
+    - engine: engine that wrote the bullet points
+    """
+    __tablename__ = "article_summaries"
+
+    content_hash = db.Column(db.String(64), unique=True, nullable=False)
+    bullets = db.Column(db.Text, nullable=False)
+    engine = db.Column(db.String(64), nullable=False)
+
+    def __init__(self, content_hash: str, bullets: str, engine: str, **kwargs):
+        db.Model.__init__(self, content_hash=content_hash, bullets=bullets, engine=engine, **kwargs)
+
+    def __repr__(self):
+        return "<Summary | {0} | {1} >".format(self.content_hash, self.engine)
+
+    def __str__(self):
+        return self.bullets
+
+    def to_dict(self):
+        return {
+            "bullets": self.bullets,
+            "engine": self.engine,
+            "created_at": self.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+        }
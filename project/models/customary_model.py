@@ -16,6 +16,34 @@ class CommonModel(db.Model):
         db.session.add(self)
         db.session.commit()
 
+    @staticmethod
+    def bulk_save(objects: list):
+        """
+        Add all objects and commit them in a single transaction,
+        rolling back the whole batch if any of them fails
+        """
+        try:
+            db.session.add_all(objects)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    @classmethod
+    def bulk_insert(cls, mappings: list, commit: bool = True):
+        """
+        Insert a batch of plain dicts (column -> value) in a single transaction,
+        skipping the ORM constructor. With commit=False the rows are only
+        flushed, for the caller to commit along with more work.
+        """
+        try:
+            db.session.bulk_insert_mappings(cls, mappings)
+            if commit:
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
     def update(self, **kwargs):
         for key, value in kwargs.items():
             setattr(self, key, value)
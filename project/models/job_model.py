@@ -0,0 +1,85 @@
+from enum import Enum
+from datetime import datetime, timedelta
+from flask import current_app
+
+from project import db
+from project.models.user_model import User, CommonModel, SurrogatePK
+
+
+class JobStatus(Enum):
+    """
+    JobStatus model:
+    - QUEUED: job accepted, waiting for a worker
+    - RUNNING: job picked up by a worker
+    - FINISHED: job completed successfully
+    - FAILED: job stopped with an error
+    - CANCELLED: job stopped because a newer job replaced it
+    """
+    QUEUED = 0
+    RUNNING = 1
+    FINISHED = 2
+    FAILED = 3
+    CANCELLED = 4
+
+
+class Job(CommonModel, SurrogatePK):
+    """
+    Job model:
+    - kind: kind of work the job runs (e.g. ingestion)
+    - status: status of the job
+    - progress: number of processed steps
+    - total: total number of steps
+    - message: last status or error message
+    - started_at: time a worker picked up the job
+    - finished_at: time the job finished or failed
+
+    - user_id: id of the user who requested the job
+    """
+    __tablename__ = "jobs"
+
+    kind = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.Enum(JobStatus), default=JobStatus.QUEUED)
+    progress = db.Column(db.Integer, default=0)
+    total = db.Column(db.Integer, default=0)
+    message = db.Column(db.Text, nullable=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    user_id = db.Column(db.Integer, db.ForeignKey(User.id), nullable=False)
+
+    def __init__(self, kind: str, user_id: int, **kwargs):
+        db.Model.__init__(self, kind=kind, user_id=user_id,
+                          status=JobStatus.QUEUED, progress=0, total=0, **kwargs)
+
+    def __repr__(self):
+        return "<Job | {0} | {1} >".format(self.kind, self.status)
+
+    def is_stale(self) -> bool:
+        """
+        Whether the job is queued or running but has not been updated for
+        JOB_STALE_SECONDS, e.g. because the process running it died
+        """
+        if self.status not in (JobStatus.QUEUED, JobStatus.RUNNING):
+            return False
+
+        stale_seconds = current_app.config.get("JOB_STALE_SECONDS")
+        return bool(stale_seconds) and \
+            self.updated_at < datetime.utcnow() - timedelta(seconds=stale_seconds)
+
+    def to_dict(self):
+        # a stale job will never finish, report it as failed
+        stale = self.is_stale()
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "kind": self.kind,
+            "status": JobStatus.FAILED.name if stale else self.status.name,
+            "stale": stale,
+            "progress": self.progress,
+            "total": self.total,
+            "message": "Job stopped responding." if stale else self.message,
+            "started_at": self.started_at.strftime("%Y-%m-%d %H:%M:%S") if self.started_at else None,
+            "finished_at": self.finished_at.strftime("%Y-%m-%d %H:%M:%S") if self.finished_at else None,
+            "created_at": self.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "updated_at": self.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
+        }
@@ -0,0 +1,194 @@
+import re
+import math
+
+from project import db
+from project.models.article_model import Article
+
+"""
+    Full-text index over article title and summary.
+
+    SQLite: an external-content FTS5 table (articles_fts) kept in sync by triggers.
+    Postgres: a generated, weighted tsvector column with a GIN index.
+    Other databases (MySQL, ...): every word matched with LIKE, newest first.
+"""
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5("
+    "title, summary, content='articles', content_rowid='id')",
+
+    "CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN "
+    "INSERT INTO articles_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary); "
+    "END",
+
+    "CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN "
+    "INSERT INTO articles_fts (articles_fts, rowid, title, summary) "
+    "VALUES ('delete', old.id, old.title, old.summary); "
+    "END",
+
+    "CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE OF title, summary ON articles BEGIN "
+    "INSERT INTO articles_fts (articles_fts, rowid, title, summary) "
+    "VALUES ('delete', old.id, old.title, old.summary); "
+    "INSERT INTO articles_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary); "
+    "END",
+]
+
+POSTGRES_DDL = [
+    "ALTER TABLE articles ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(summary, '')), 'B')"
+    ") STORED",
+
+    "CREATE INDEX IF NOT EXISTS ix_articles_search_vector ON articles USING GIN (search_vector)",
+]
+
+SQLITE_SEARCH = """
+    SELECT articles.id FROM articles_fts
+    JOIN articles ON articles.id = articles_fts.rowid
+    JOIN user_articles ON user_articles.article_id = articles.id
+    WHERE articles_fts MATCH :query AND user_articles.user_id = :user_id
+    ORDER BY bm25(articles_fts, 10.0, 1.0), articles.id DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+SQLITE_COUNT = """
+    SELECT COUNT(*) FROM articles_fts
+    JOIN user_articles ON user_articles.article_id = articles_fts.rowid
+    WHERE articles_fts MATCH :query AND user_articles.user_id = :user_id
+"""
+
+POSTGRES_SEARCH = """
+    SELECT articles.id FROM articles
+    JOIN user_articles ON user_articles.article_id = articles.id
+    WHERE articles.search_vector @@ plainto_tsquery('english', :query)
+    AND user_articles.user_id = :user_id
+    ORDER BY ts_rank(articles.search_vector, plainto_tsquery('english', :query)) DESC, articles.id DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+POSTGRES_COUNT = """
+    SELECT COUNT(*) FROM articles
+    JOIN user_articles ON user_articles.article_id = articles.id
+    WHERE articles.search_vector @@ plainto_tsquery('english', :query)
+    AND user_articles.user_id = :user_id
+"""
+
+
+@db.event.listens_for(Article.__table__, "after_create")
+def create_search_index(target, connection, **kwargs):
+    """
+    Create the full-text index right after the articles table
+    """
+    dialect = connection.dialect.name
+
+    if dialect == "sqlite":
+        statements = SQLITE_DDL
+    elif dialect == "postgresql":
+        statements = POSTGRES_DDL
+    else:
+        return
+
+    for statement in statements:
+        connection.execute(db.text(statement))
+
+
+@db.event.listens_for(Article.__table__, "before_drop")
+def drop_search_index(target, connection, **kwargs):
+    """
+    Drop the FTS5 table along with the articles table
+    """
+    if connection.dialect.name == "sqlite":
+        connection.execute(db.text("DROP TABLE IF EXISTS articles_fts"))
+
+
+def rebuild_search_index():
+    """
+    Create the full-text index if missing and re-index every article
+    """
+    with db.engine.begin() as connection:
+        create_search_index(Article.__table__, connection)
+
+        if connection.dialect.name == "sqlite":
+            connection.execute(db.text(
+                "INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')"))
+
+
+def to_match_query(query: str) -> str:
+    """
+    Turn free text into an FTS5 query matching every word (as a prefix)
+    """
+    words = re.findall(r"\w+", query, flags=re.UNICODE)
+    return " ".join('"{}"*'.format(word) for word in words)
+
+
+def like_query(user_id: int, query: str):
+    """
+    Query of the articles in the user's feed whose title or summary
+    contains every word, for databases without a full-text index
+    """
+    articles = Article.for_user(user_id)
+
+    for word in re.findall(r"\w+", query, flags=re.UNICODE):
+        pattern = "%{}%".format(word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_"))
+        articles = articles.filter(db.or_(
+            Article.title.ilike(pattern, escape="\\"),
+            Article.summary.ilike(pattern, escape="\\")
+        ))
+
+    return articles
+
+
+def search_articles(user_id: int, query: str, page: int = 1, limit: int = 10) -> dict:
+    """
+    Search the user's feed, best matches first. Returns the page of
+    articles along with the same pagination fields as paginate()
+    """
+    dialect = db.engine.dialect.name
+    page = max(int(page), 1)
+    limit = max(int(limit), 1)
+
+    search = count = None
+    if dialect == "sqlite":
+        search, count = SQLITE_SEARCH, SQLITE_COUNT
+        query = to_match_query(query)
+    elif dialect == "postgresql":
+        search, count = POSTGRES_SEARCH, POSTGRES_COUNT
+
+    items, total, ids = [], 0, []
+
+    if query.strip() and search is not None:
+        params = {"query": query, "user_id": user_id}
+
+        total = db.session.execute(db.text(count), params).scalar()
+        ids = db.session.execute(
+            db.text(search),
+            dict(params, limit=limit, offset=(page - 1) * limit)
+        ).scalars().all()
+
+    elif query.strip():
+        articles = like_query(user_id, query)
+
+        total = articles.count()
+        ids = [
+            id for id, in articles.with_entities(Article.id).order_by(
+                Article.date.desc(), Article.id.desc()
+            ).limit(limit).offset((page - 1) * limit)
+        ]
+
+    if ids:
+        articles = {
+            article.id: article
+            for article in Article.query.filter(Article.id.in_(ids))
+        }
+        items = [articles[id] for id in ids if id in articles]
+
+    pages = int(math.ceil(total / limit)) if total else 0
+
+    return {
+        "items": items,
+        "total": total,
+        "pages": pages,
+        "page": page,
+        "has_next": page < pages,
+        "has_prev": page > 1,
+    }
@@ -0,0 +1,31 @@
+from project import db
+from project.models.customary_model import CommonModel, SurrogatePK
+
+
+class Upload(CommonModel, SurrogatePK):
+    """
+    Upload model (index of files already uploaded to ImageKit):
+    - content_hash: sha256 hex digest of the file content
+    - url: url of the uploaded file
+    - size: size of the file in bytes
+    - type: content type of the file
+    - renditions: urls of the resized renditions of the file ({size: url})
+    """
+    __tablename__ = "uploads"
+
+    content_hash = db.Column(db.String(64), unique=True, nullable=False)
+    url = db.Column(db.String(256), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    type = db.Column(db.String(128), nullable=True)
+    renditions = db.Column(db.JSON, nullable=True)
+
+    def __init__(self, content_hash: str, url: str, size: int, type: str = None, **kwargs):
+        db.Model.__init__(self, content_hash=content_hash, url=url,
+                          size=size, type=type, **kwargs)
+
+    def __repr__(self):
+        return "<Upload | {0} | {1} >".format(self.content_hash, self.url)
+
+    def has_renditions(self, sizes: tuple) -> bool:
+        """Check whether renditions of every size are stored."""
+        return all(str(size) in (self.renditions or {}) for size in sizes)
@@ -1,13 +1,56 @@
+import os
 import jwt
+import hashlib
 import time
+import uuid
 from datetime import datetime, timedelta
 
 from enum import Enum
 from flask import current_app
 
-from project import bcrypt, db
+from project import db, metrics
+from project.cache import make_cache
+from project.hashing import hash_password, check_password, hash_rounds
 from project.models import CommonModel, SurrogatePK
 
+# auth-relevant user fields, memory (per process) or sqlite (shared by workers)
+principal_cache = make_cache(
+    backend=os.getenv("PRINCIPAL_CACHE_BACKEND", "memory"),
+    default_ttl=int(os.getenv("PRINCIPAL_CACHE_TTL", 30)),
+    max_size=int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000)),
+    path=os.getenv("PRINCIPAL_CACHE_PATH", "principal_cache.db")
+)
+metrics.register("principal_cache", principal_cache.stats)
+
+# verified JWT payloads keyed by token digest, each entry expires with its token
+token_cache = make_cache(
+    backend="memory",
+    max_size=int(os.getenv("JWT_CACHE_SIZE", 10000))
+)
+metrics.register("jwt_cache", token_cache.stats)
+
+
+def verify_jwt(token: str) -> dict:
+    """
+    Verify a JWT and return its payload, reusing earlier verifications
+    of the same token until it expires
+    """
+    key = "jwt:{}".format(hashlib.sha256(str(token).encode("utf-8")).hexdigest())
+
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = jwt.decode(
+            token,
+            current_app.config.get('SECRET_KEY'),
+            algorithms=['HS256']
+        )
+
+        ttl = payload["exp"] - time.time() if "exp" in payload else None
+        if ttl is None or ttl > 0:
+            token_cache.set(key, payload, ttl=ttl)
+
+    return payload
+
 
 class Role(Enum):
     """
@@ -28,6 +71,7 @@ class User(CommonModel, SurrogatePK):
     - email: email of the user
     - password: password of the user
     - profile_image: profile picture of the user
+    - profile_images: urls of the resized profile pictures ({size: url})
     - role: role of the user
     """
     __tablename__ = "users"
@@ -38,6 +82,7 @@ class User(CommonModel, SurrogatePK):
     email = db.Column(db.String(80), unique=True, nullable=False)
     password = db.Column(db.String(128), nullable=False)
     profile_image = db.Column(db.String(256), nullable=True)
+    profile_images = db.Column(db.JSON, nullable=True)
     role = db.Column(db.Enum(Role), default=Role.USER)
 
     is_active = db.Column(db.Boolean, default=True)
@@ -65,21 +110,95 @@ class User(CommonModel, SurrogatePK):
 
     def set_password(self, password: str):
         """Set password."""
-        self.password = bcrypt.generate_password_hash(
+        self.password = hash_password(
             password,
             current_app.config.get("BCRYPT_LOG_ROUNDS")
-        ).decode("utf-8")
+        )
+        self.invalidate_principal()
+
+    def update(self, **kwargs):
+        """Update user and drop its cached principal."""
+        CommonModel.update(self, **kwargs)
+        self.invalidate_principal()
+
+    def delete(self):
+        """Delete user and drop its cached principal."""
+        CommonModel.delete(self)
+        self.invalidate_principal()
+
+    def suspend(self, suspended: bool = True):
+        """Suspend (or reinstate) user."""
+        self.update(is_suspended=suspended)
+
+    def to_principal(self):
+        """Auth-relevant fields of the user."""
+        return {
+            "id": self.id,
+            "role": self.role.name,
+            "is_active": self.is_active,
+            "is_suspended": self.is_suspended,
+        }
+
+    def invalidate_principal(self):
+        """Drop cached principal of the user."""
+        if self.id is not None:
+            principal_cache.delete("principal:{}".format(self.id))
+
+    @staticmethod
+    def get_principal(user_id: int):
+        """
+        Get auth-relevant fields of a user, from the principal cache when possible
+        """
+        key = "principal:{}".format(int(user_id))
+
+        principal = principal_cache.get(key)
+        if principal is None:
+            user = User.query.get(int(user_id))
+            if not user:
+                return None
+
+            principal = user.to_principal()
+            principal_cache.set(key, principal)
+
+        return principal
 
     def check_password(self, value: str):
         """Check password."""
-        return bcrypt.check_password_hash(
-            self.password,
-            value.encode("utf-8")
-        )
+        return check_password(self.password, value)
+
+    def needs_rehash(self):
+        """Check whether password was hashed with another cost factor than configured."""
+        return hash_rounds(self.password) != current_app.config.get("BCRYPT_LOG_ROUNDS")
 
     def encode_auth_token(self, user_id: int):
         """
-        Generates the Auth Token
+        Generates the short-lived access token, carrying the claims
+        authenticate needs so it can skip the database
+        """
+        try:
+            payload = {
+                'exp': datetime.utcnow() + timedelta(
+                    minutes=current_app.config.get('ACCESS_TOKEN_EXPIRATION_MINUTES')
+                ),
+                'iat': datetime.utcnow(),
+                'sub': user_id,
+                'jti': uuid.uuid4().hex,
+                'type': 'access',
+                'role': self.role.name,
+                'is_active': self.is_active,
+                'is_suspended': self.is_suspended,
+            }
+            return jwt.encode(
+                payload,
+                current_app.config.get('SECRET_KEY'),
+                algorithm='HS256'
+            )
+        except Exception as e:
+            return e
+
+    def encode_refresh_token(self):
+        """
+        Generates the long-lived refresh token
         """
         try:
             payload = {
@@ -88,7 +207,9 @@ class User(CommonModel, SurrogatePK):
                     seconds=current_app.config.get('TOKEN_EXPIRATION_SECONDS')
                 ),
                 'iat': datetime.utcnow(),
-                'sub': user_id
+                'sub': self.id,
+                'jti': uuid.uuid4().hex,
+                'type': 'refresh',
             }
             return jwt.encode(
                 payload,
@@ -99,23 +220,29 @@ class User(CommonModel, SurrogatePK):
             return e
 
     @staticmethod
-    def decode_auth_token(auth_token: str):
+    def decode_token(token: str):
         """
-        Decodes the auth token
+        Decodes a token into its payload (an error message if invalid)
         """
         try:
-            payload = jwt.decode(
-                auth_token,
-                current_app.config.get('SECRET_KEY'),
-                algorithms=['HS256']
-            )
-            return payload['sub']
+            return verify_jwt(token)
 
         except jwt.ExpiredSignatureError:
             return 'Signature expired. Please log in again.'
         except jwt.InvalidTokenError:
             return 'Invalid token. Please log in again.'
 
+    @staticmethod
+    def decode_auth_token(auth_token: str):
+        """
+        Decodes the auth token
+        """
+        payload = User.decode_token(auth_token)
+        if isinstance(payload, str):
+            return payload
+
+        return payload['sub']
+
     def get_reset_password_token(self, expires_in: int = 600):
         """
         Generate a reset password token.
@@ -135,11 +262,7 @@ class User(CommonModel, SurrogatePK):
         Verify a reset password token.
         """
         try:
-            id = jwt.decode(
-                token,
-                current_app.config["SECRET_KEY"],
-                algorithms=["HS256"]
-            )["reset_password"]
+            id = verify_jwt(token)["reset_password"]
 
         except:
             return None
@@ -159,6 +282,7 @@ class User(CommonModel, SurrogatePK):
             "username": self.username,
             "email": self.email,
             "profile_image": self.profile_image,
+            "profile_images": self.profile_images or {},
             "role": self.role.name,
             "is_active": self.is_active,
             "is_suspended": self.is_suspended,
@@ -217,27 +341,79 @@ class UserSubscription(CommonModel, SurrogatePK):
 
 class BlacklistToken(CommonModel, SurrogatePK):
     """
-    Token Model for storing JWT tokens
+    Token Model for storing revoked JWT tokens:
+    - digest: sha256 hex digest of the token
+    - expires_at: expiry of the token, the row can be pruned after it
+    - blacklisted_on: time the token was revoked
     """
     __tablename__ = 'blacklist_tokens'
 
-    token = db.Column(db.String(500), unique=True, nullable=False)
-    blacklisted_on = db.Column(db.DateTime, nullable=False)
+    digest = db.Column(db.String(64), unique=True, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=True, index=True)
+    blacklisted_on = db.Column(db.DateTime, nullable=False, index=True)
 
     def __init__(self, token: str):
-        self.token = token
+        self.digest = self.digest_token(token)
+        self.expires_at = self.token_expiry(token)
         self.blacklisted_on = datetime.now()
 
     def __repr__(self):
-        return '<id: token: {}'.format(self.token)
+        return '<id: digest: {}'.format(self.digest)
+
+    @staticmethod
+    def digest_token(auth_token: str) -> str:
+        """
+        Fixed-size digest of a token
+        """
+        return hashlib.sha256(str(auth_token).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def token_expiry(auth_token: str):
+        """
+        Expiry (UTC) of a token, None if it has none or cannot be read
+        """
+        try:
+            payload = jwt.decode(
+                auth_token,
+                options={"verify_signature": False, "verify_exp": False}
+            )
+            return datetime.utcfromtimestamp(payload["exp"])
+
+        except Exception:
+            return None
 
     @staticmethod
     def check_blacklist(auth_token: str):
         """
         Check whether auth token has been blacklisted
         """
-        res = BlacklistToken.query.filter_by(token=str(auth_token)).first()
+        res = BlacklistToken.query.filter_by(
+            digest=BlacklistToken.digest_token(auth_token)).first()
         if res:
             return True
         else:
             return False
+
+    @staticmethod
+    def prune_expired(batch_size: int = 1000) -> int:
+        """
+        Delete revocations of tokens that have expired anyway, in batches
+        """
+        deleted = 0
+
+        while True:
+            ids = [
+                row.id for row in BlacklistToken.query.with_entities(BlacklistToken.id).filter(
+                    BlacklistToken.expires_at < datetime.utcnow()
+                ).limit(batch_size)
+            ]
+
+            if not ids:
+                break
+
+            BlacklistToken.query.filter(BlacklistToken.id.in_(ids)).delete(
+                synchronize_session=False)
+            db.session.commit()
+            deleted += len(ids)
+
+        return deleted
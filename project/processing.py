@@ -0,0 +1,135 @@
+import io
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+"""
+    CPU-bound work run on process pools.
+
+    Pools are created once per server process when the app is created, with
+    the spawn (or forkserver) start method: forking a multi-threaded server
+    process can leave the child deadlocked on a lock some other thread held.
+    Spawned workers import this module by name, so it only imports what the
+    work itself needs.
+"""
+
+# pool name -> config setting holding its number of worker processes
+POOLS = {
+    "images": "IMAGE_WORKERS",
+    "keywords": "KEYWORD_WORKERS",
+}
+
+_pools = {}
+_pool_settings = {}
+_pools_lock = threading.Lock()
+
+# per worker process
+_keyword_extractor = None
+
+
+def init_app(app):
+    """
+    Create the process pools from the app config
+    """
+    for name, setting in POOLS.items():
+        create_pool(name, app.config.get(setting), app.config.get("PROCESS_START_METHOD"))
+
+
+def create_pool(name: str, workers: int, start_method: str = "spawn") -> ProcessPoolExecutor:
+    """
+    Create the named process pool, unless it exists already
+    """
+    with _pools_lock:
+        if name not in _pools:
+            _pools[name] = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(start_method)
+            )
+            _pool_settings[name] = (workers, start_method)
+
+        return _pools[name]
+
+
+def reset_pool(name: str, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+    """
+    Replace the named pool after a worker process died (BrokenProcessPool),
+    unless another thread replaced it already
+    """
+    with _pools_lock:
+        if _pools.get(name) is broken:
+            workers, start_method = _pool_settings[name]
+            _pools[name] = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(start_method)
+            )
+            broken.shutdown(wait=False)
+
+        return _pools[name]
+
+
+def get_pool(name: str) -> ProcessPoolExecutor:
+    """
+    Get the named process pool (see init_app)
+    """
+    pool = _pools.get(name)
+    if pool is None:
+        raise RuntimeError("Process pool {} has not been created.".format(name))
+
+    return pool
+
+
+def render_renditions(path: str, sizes: tuple, image_format: str = "WEBP", quality: int = 80) -> dict:
+    """
+    Render the image at path at each size (longest side), without metadata.
+    Returns {size: (bytes, extension)}. Runs in a worker process.
+    """
+    from PIL import Image, ImageOps
+
+    renditions = {}
+
+    with Image.open(path) as image:
+        # let JPEG decode at a reduced scale when possible
+        image.draft("RGB", (max(sizes), max(sizes)))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ("RGBA", "LA", "P")
+
+        for size in sizes:
+            rendition = image.copy()
+            rendition.thumbnail((size, size), Image.LANCZOS)
+
+            output = io.BytesIO()
+            try:
+                rendition = rendition.convert("RGBA" if has_alpha else "RGB")
+                rendition.save(output, format=image_format, quality=quality)
+                extension = image_format.lower()
+
+            except (KeyError, OSError):
+                # no encoder for the format, JPEG is always there
+                output = io.BytesIO()
+                rendition.convert("RGB").save(output, format="JPEG", quality=quality, optimize=True)
+                extension = "jpg"
+
+            renditions[size] = (output.getvalue(), extension)
+
+    return renditions
+
+
+def extract_keywords(texts: list, max_keywords: int = 10) -> tuple:
+    """
+    Extract YAKE keywords of every text. Runs in a worker process.
+    Returns (keywords per text, seconds spent).
+    """
+    global _keyword_extractor
+
+    if _keyword_extractor is None:
+        import yake
+        _keyword_extractor = yake.KeywordExtractor()
+
+    started_at = time.perf_counter()
+    keywords = [
+        [keyword for keyword, score in _keyword_extractor.extract_keywords(text)[:max_keywords]]
+        for text in texts
+    ]
+
+    return keywords, time.perf_counter() - started_at
@@ -0,0 +1,89 @@
+import os
+import tempfile
+
+import pytest
+
+# the app reads its settings on import
+database_dir = tempfile.mkdtemp(prefix="buzzin-tests-")
+os.environ.setdefault("APP_SETTINGS", "project.config.TestingConfig")
+os.environ.setdefault("DATABASE_TEST_URL", "sqlite:///{}".format(os.path.join(database_dir, "test.db")))
+
+from project import create_app, db as _db  # noqa: E402
+from project.models import Article, User, UserArticle  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    app = create_app()
+
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def db(app):
+    _db.create_all()
+    yield _db
+    _db.session.remove()
+    _db.drop_all()
+
+
+@pytest.fixture
+def client(app, db):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(db):
+    count = [0]
+
+    def make_user(password: str = "greaterthaneight", **kwargs):
+        count[0] += 1
+        user = User(
+            firstname="Test",
+            lastname="User",
+            email="user{}@buzzin.ai".format(count[0]),
+            password=password,
+            **kwargs
+        )
+        user.save()
+        return user
+
+    return make_user
+
+
+@pytest.fixture
+def make_article(db):
+    count = [0]
+
+    def make_article(user_ids: list = (), title: str = None, summary: str = None,
+                     date: str = "2023-05-01 12:00:00", keywords: list = None):
+        count[0] += 1
+        article = Article(
+            title=title or "Article {}".format(count[0]),
+            source="example.com",
+            author="Author",
+            date=date,
+            keywords=keywords or [],
+            summary=summary,
+            link="https://example.com/article-{}".format(count[0]),
+        )
+        article.save()
+
+        UserArticle.bulk_save([
+            UserArticle(user_id=user_id, article_id=article.id, date=article.date)
+            for user_id in user_ids
+        ])
+        return article
+
+    return make_article
+
+
+@pytest.fixture
+def login(client):
+    def login(user: User, password: str = "greaterthaneight") -> dict:
+        response = client.post("/users/auth/login", json={"email": user.email, "password": password})
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()["data"]
+
+    return login
@@ -0,0 +1,88 @@
+from project.models import BlacklistToken, User
+
+
+def test_login_returns_access_and_refresh_tokens(make_user, login):
+    user = make_user()
+
+    tokens = login(user)
+
+    assert User.decode_token(tokens["auth_token"])["type"] == "access"
+    assert User.decode_token(tokens["refresh_token"])["type"] == "refresh"
+
+
+def test_refresh_rotates_the_refresh_token(client, make_user, login):
+    tokens = login(make_user())
+
+    response = client.post("/users/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+    assert response.status_code == 200
+    data = response.get_json()["data"]
+    assert data["refresh_token"] != tokens["refresh_token"]
+    assert User.decode_token(data["auth_token"])["type"] == "access"
+    assert BlacklistToken.check_blacklist(tokens["refresh_token"])
+
+    # the rotated token works, the used one does not
+    response = client.post("/users/auth/refresh", json={"refresh_token": data["refresh_token"]})
+    assert response.status_code == 200
+
+    response = client.post("/users/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+    assert response.get_json()["message"] == "Token blacklisted. Please log in again."
+
+
+def test_refresh_rejects_access_tokens(client, make_user, login):
+    tokens = login(make_user())
+
+    response = client.post("/users/auth/refresh", json={"refresh_token": tokens["auth_token"]})
+
+    assert response.status_code == 401
+
+
+def test_refresh_rejects_suspended_users(client, make_user, login):
+    user = make_user()
+    tokens = login(user)
+    user.suspend()
+
+    response = client.post("/users/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+    assert response.status_code == 401
+    assert response.get_json()["message"] == "Account suspended. Please contact admin."
+
+
+def test_logout_revokes_the_refresh_token(client, make_user, login):
+    tokens = login(make_user())
+
+    response = client.post(
+        "/users/auth/logout",
+        json={"refresh_token": tokens["refresh_token"]},
+        headers={"Authorization": "Bearer " + tokens["auth_token"]}
+    )
+
+    assert response.status_code == 200
+    response = client.post("/users/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+
+
+def test_logout_requires_the_refresh_token(client, make_user, login):
+    tokens = login(make_user())
+
+    response = client.post(
+        "/users/auth/logout",
+        headers={"Authorization": "Bearer " + tokens["auth_token"]}
+    )
+
+    assert response.status_code == 400
+
+
+def test_logout_rejects_refresh_tokens_of_other_users(client, make_user, login):
+    tokens = login(make_user())
+    other = login(make_user())
+
+    response = client.post(
+        "/users/auth/logout",
+        json={"refresh_token": other["refresh_token"]},
+        headers={"Authorization": "Bearer " + tokens["auth_token"]}
+    )
+
+    assert response.status_code == 400
+    assert not BlacklistToken.check_blacklist(other["refresh_token"])
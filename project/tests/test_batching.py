@@ -0,0 +1,68 @@
+import pytest
+
+from project.api import scheduler
+from project.api.scheduler import RateLimiter
+from project.api.utils import estimate_tokens, pack_batches, parse_bullet_points_batch
+from project.exceptions import ServiceUnavailableError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # time only moves when the limiter sleeps
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    monkeypatch.setattr(scheduler.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(scheduler.time, "sleep", sleep)
+    return now
+
+
+def test_parse_batch_answer_by_article_number():
+    content = (
+        "Here are the bullet points.\n"
+        "**Article 2:**\n- second\n"
+        "### Article 1\n- first\n- again\n"
+        "Article 2\n- duplicate\n"
+        "Article 4:\n- out of range\n"
+    )
+
+    assert parse_bullet_points_batch(content, 3) == ["- first\n- again", "- second", None]
+
+
+def test_pack_batches_respects_budget_and_size():
+    texts = ["a" * 40, "b" * 40, "c" * 400, "d" * 4, "e" * 4, "f" * 4]
+    cost = estimate_tokens(texts[0]) + 5
+
+    batches = pack_batches(texts, token_budget=2 * cost, max_batch_size=2, output_tokens=5)
+
+    # the long text is over the budget on its own
+    assert batches == [[0, 1], [2], [3, 4], [5]]
+    assert pack_batches([], 100, 10) == []
+
+
+def test_rate_limiter_waits_for_the_bucket_to_refill(clock):
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=600)
+
+    limiter.acquire(tokens=300)
+    limiter.acquire(tokens=300)
+    assert clock[0] == 0
+
+    limiter.acquire(tokens=100)
+    assert clock[0] == pytest.approx(10)
+    assert limiter.stats()["acquired"] == 3
+
+
+def test_rate_limiter_rejects_waits_over_the_timeout(clock):
+    limiter = RateLimiter(requests_per_minute=1)
+    limiter.acquire()
+
+    with pytest.raises(ServiceUnavailableError):
+        limiter.acquire(timeout=30)
+
+    assert clock[0] == 0
+    assert limiter.rejected == 1
+
+    limiter.acquire(timeout=60)
+    assert clock[0] == pytest.approx(60)
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+from project.models import BlacklistToken
+from project.api.authentications import BlacklistCache, BloomFilter, token_digest
+
+
+def revoke(token: str, blacklisted_on: datetime = None, expires_at: datetime = None) -> BlacklistToken:
+    row = BlacklistToken(token)
+    row.blacklisted_on = blacklisted_on or row.blacklisted_on
+    row.expires_at = expires_at or row.expires_at
+    row.save()
+    return row
+
+
+def test_blacklist_stores_digests_with_expiry(make_user, login):
+    tokens = login(make_user())
+
+    revoke(tokens["refresh_token"])
+
+    row = BlacklistToken.query.one()
+    assert row.digest == BlacklistToken.digest_token(tokens["refresh_token"])
+    assert len(row.digest) == 64
+    assert row.expires_at > datetime.utcnow()
+    assert BlacklistToken.check_blacklist(tokens["refresh_token"])
+
+
+def test_prune_expired_keeps_live_revocations(db):
+    revoke("expired", expires_at=datetime.utcnow() - timedelta(minutes=1))
+    revoke("live", expires_at=datetime.utcnow() + timedelta(days=1))
+    revoke("no expiry")
+
+    assert BlacklistToken.prune_expired(batch_size=1) == 1
+    assert not BlacklistToken.check_blacklist("expired")
+    assert BlacklistToken.check_blacklist("live")
+    assert BlacklistToken.check_blacklist("no expiry")
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000)
+    digests = [token_digest("token-{}".format(i)) for i in range(1000)]
+
+    for digest in digests:
+        bloom.add(digest)
+
+    assert all(digest in bloom for digest in digests)
+    assert sum(token_digest("other-{}".format(i)) in bloom for i in range(1000)) < 20
+
+
+def test_cache_answers_unknown_tokens_from_memory(db):
+    cache = BlacklistCache(capacity=100)
+    revoke("revoked")
+
+    assert cache.is_blacklisted("revoked")
+    assert not cache.is_blacklisted("valid")
+    assert cache.db_checks == 1
+
+
+def test_resync_picks_up_late_commits_within_the_overlap(app, db):
+    cache = BlacklistCache(capacity=100)
+    now = datetime.now()
+    revoke("first", blacklisted_on=now)
+    assert not cache.is_blacklisted("unknown")
+
+    overlap = app.config.get("BLACKLIST_RESYNC_OVERLAP_SECONDS")
+    # stamped before the last resync, committed after it
+    revoke("late", blacklisted_on=now - timedelta(seconds=overlap / 2))
+    revoke("too late", blacklisted_on=now - timedelta(seconds=overlap * 2))
+    cache._next_sync = 0
+
+    assert cache.is_blacklisted("late")
+    assert not cache.is_blacklisted("too late")
+
+
+def test_resync_grows_the_filter_past_its_capacity(db):
+    cache = BlacklistCache(capacity=2)
+    tokens = ["token-{}".format(i) for i in range(3)]
+    for token in tokens:
+        revoke(token)
+
+    assert cache.is_blacklisted(tokens[0])
+    assert cache.capacity == 4
+    assert all(cache.is_blacklisted(token) for token in tokens)
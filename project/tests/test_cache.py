@@ -0,0 +1,49 @@
+import time
+
+from project.cache import MemoryCache, cached
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.evictions == 1
+    assert len(cache) == 2
+
+
+def test_memory_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = MemoryCache(default_ttl=10)
+    cache.set("short", 1)
+    cache.set("long", 2, ttl=60)
+    forever = MemoryCache()
+    forever.set("forever", 3)
+
+    now[0] += 30
+
+    assert len(cache) == 1
+    assert cache.get("short", "missing") == "missing"
+    assert cache.get("long") == 2
+    assert cache.stats()["misses"] == 1
+    assert forever.get("forever") == 3
+
+
+def test_cached_skips_results_rejected_by_should_cache():
+    calls = []
+
+    @cached(MemoryCache(), should_cache=lambda result: result is not None)
+    def lookup(key):
+        calls.append(key)
+        return {"found": key}.get(key)
+
+    assert lookup("found") == lookup("found") == "found"
+    assert lookup("missing") is lookup("missing") is None
+    assert calls == ["found", "missing", "missing"]
+    assert len(lookup.cache) == 1
@@ -0,0 +1,48 @@
+from project.api.extractive import split_sentences, summarize_texts, get_extractive_bullet_points
+
+
+def test_split_sentences_keeps_abbreviations_and_initials():
+    text = "Dr. Smith met J. R. Tolkien in the U.S. today.  Was it   Jan. 5? \"Yes,\" he said. 3 more came."
+
+    assert split_sentences(text) == [
+        "Dr. Smith met J. R. Tolkien in the U.S. today.",
+        "Was it Jan. 5?",
+        "\"Yes,\" he said.",
+        "3 more came.",
+    ]
+
+
+def test_split_sentences_of_empty_text():
+    assert split_sentences(None) == []
+    assert split_sentences("   ") == []
+
+
+def test_summary_keeps_the_most_central_sentences_in_order():
+    text = (
+        "Python is a programming language. "
+        "The weather was sunny. "
+        "Python programming language releases are yearly. "
+        "Each Python release improves the language."
+    )
+
+    assert summarize_texts([text], max_sentences=2) == [[
+        "Python is a programming language.",
+        "Python programming language releases are yearly.",
+    ]]
+
+
+def test_texts_are_summarized_independently_across_batches():
+    texts = [
+        "Cats sleep a lot. Cats purr.",
+        "",
+        "Rust is fast. Rust is safe. Rust compiles slowly.",
+        "One sentence only.",
+    ]
+
+    summaries = summarize_texts(texts, max_sentences=2, batch_size=2)
+    single = [summarize_texts([text], max_sentences=2)[0] for text in texts]
+
+    assert summaries == single
+    assert summaries[1] == []
+    assert summaries[3] == ["One sentence only."]
+    assert get_extractive_bullet_points(texts[0]) == "- Cats sleep a lot.\n- Cats purr."
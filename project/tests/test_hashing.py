@@ -0,0 +1,45 @@
+import threading
+
+import pytest
+
+from project.exceptions import ServiceUnavailableError
+from project.hashing import HashingPool, hash_password, check_password, hash_rounds
+
+
+@pytest.fixture
+def pool(app, monkeypatch):
+    # one worker, no queue, give up on calls after 50ms
+    for key, value in {"BCRYPT_WORKERS": 1, "BCRYPT_MAX_QUEUE": 0,
+                       "BCRYPT_FAST_FAIL": True, "BCRYPT_TIMEOUT": 0.05}.items():
+        monkeypatch.setitem(app.config, key, value)
+
+    pool = HashingPool()
+    yield pool
+    pool._executor.shutdown(wait=True)
+
+
+def test_hash_and_check_password(app):
+    password_hash = hash_password("greaterthaneight", 4)
+
+    assert hash_rounds(password_hash) == 4
+    assert check_password(password_hash, "greaterthaneight")
+    assert not check_password(password_hash, "somethingelse")
+
+
+def test_timed_out_call_keeps_its_slot_until_done(pool):
+    release = threading.Event()
+
+    with pytest.raises(ServiceUnavailableError):
+        pool.run(release.wait)
+
+    # still hashing, so no room for another call
+    assert pool.stats()["depth"] == 1
+    with pytest.raises(ServiceUnavailableError):
+        pool.run(lambda: "next")
+    assert pool.rejected == 2
+
+    release.set()
+    pool._executor.submit(lambda: None).result()
+
+    assert pool.run(lambda: "next") == "next"
+    assert (pool.depth, pool.completed) == (0, 2)
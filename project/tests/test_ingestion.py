@@ -0,0 +1,181 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from project.models import Article, ArticleKeyword, Job, JobStatus, UserArticle, UserArticleSignature
+from project.api import ingestion, utils
+from project.api.jobs import JobCancelled
+
+
+@pytest.fixture(autouse=True)
+def run_tasks_inline(monkeypatch):
+    # prune orphaned articles right away instead of on the job executor
+    monkeypatch.setattr(ingestion, "submit_task", lambda func, *args, **kwargs: func(*args, **kwargs))
+
+
+@pytest.fixture
+def make_job(db):
+    def make_job(user_id: int) -> Job:
+        job = Job(kind="ingestion", user_id=user_id)
+        job.save()
+        return job
+
+    return make_job
+
+
+def news(number: int) -> dict:
+    # a NewsCatcher article, without excerpt so no keywords are extracted
+    return {
+        "link": "https://example.com/news-{}".format(number),
+        "title": "News {}".format(number),
+        "clean_url": "example.com",
+        "authors": ["Author"],
+        "published_date": "2023-05-0{} 12:00:00".format(number),
+        "summary": "Summary {}".format(number),
+        "media": "",
+        "excerpt": "",
+    }
+
+
+def upsert(job: Job, user_id: int, articles: dict, signatures: list):
+    """
+    Upsert {signature: [article, ...]} the way ingest_articles does
+    """
+    fetched = {}
+    for signature, news_articles in articles.items():
+        for article in news_articles:
+            fetched.setdefault(article["link"], (set(), article))[0].add(signature)
+
+    ingestion.upsert_articles(job, user_id, fetched, signatures)
+
+
+def feed(user_id: int) -> dict:
+    """
+    {article link: signatures} of the user's feed
+    """
+    return {
+        article.link: {
+            row.signature for row in UserArticleSignature.query.join(UserArticle).filter(
+                UserArticle.user_id == user_id, UserArticle.article_id == article.id)
+        }
+        for article in Article.for_user(user_id)
+    }
+
+
+def test_articles_are_shared_between_feeds(make_user, make_job):
+    first, second = make_user(), make_user()
+
+    upsert(make_job(first.id), first.id, {"a": [news(1)]}, ["a"])
+    upsert(make_job(second.id), second.id, {"b": [news(1), news(2)]}, ["b"])
+
+    assert Article.query.count() == 2
+    assert feed(first.id) == {news(1)["link"]: {"a"}}
+    assert set(feed(second.id)) == {news(1)["link"], news(2)["link"]}
+
+
+def test_article_matched_by_another_query_is_kept(make_user, make_job):
+    user = make_user()
+    upsert(make_job(user.id), user.id, {"a": [news(1), news(2)], "b": [news(2), news(3)]}, ["a", "b"])
+    assert feed(user.id)[news(2)["link"]] == {"a", "b"}
+
+    # query a is dropped from the settings, nothing new for b
+    upsert(make_job(user.id), user.id, {"b": []}, ["b"])
+
+    assert feed(user.id) == {news(2)["link"]: {"b"}, news(3)["link"]: {"b"}}
+    assert Article.query.count() == 2
+
+
+def test_orphaned_articles_are_pruned(make_user, make_job):
+    user, other = make_user(), make_user()
+    upsert(make_job(user.id), user.id, {"a": [news(1), news(2)]}, ["a"])
+    upsert(make_job(other.id), other.id, {"c": [news(2)]}, ["c"])
+    article = Article.query.filter_by(link=news(1)["link"]).one()
+    article.set_keywords(["python"])
+    article.save()
+
+    upsert(make_job(user.id), user.id, {"b": [news(3)]}, ["b"])
+
+    assert feed(user.id) == {news(3)["link"]: {"b"}}
+    # news 2 is still in the other feed, news 1 in none
+    assert {article.link for article in Article.query} == {news(2)["link"], news(3)["link"]}
+    assert ArticleKeyword.query.count() == 0
+
+
+def test_refetched_article_keeps_one_membership(make_user, make_job):
+    user = make_user()
+    upsert(make_job(user.id), user.id, {"a": [news(1)]}, ["a"])
+    upsert(make_job(user.id), user.id, {"a": [news(1)], "b": [news(1)]}, ["a", "b"])
+
+    assert UserArticle.query.filter_by(user_id=user.id).count() == 1
+    assert feed(user.id) == {news(1)["link"]: {"a", "b"}}
+
+
+def test_superseded_job_leaves_the_feed_alone(make_user, make_job):
+    user = make_user()
+    upsert(make_job(user.id), user.id, {"a": [news(1)]}, ["a"])
+    stale = make_job(user.id)
+    make_job(user.id)
+
+    with pytest.raises(JobCancelled):
+        upsert(stale, user.id, {"b": [news(2)]}, ["b"])
+
+    assert feed(user.id) == {news(1)["link"]: {"a"}}
+
+
+def test_progress_is_counted_as_each_topic_is_done(monkeypatch, make_user, make_job):
+    user = make_user()
+    job = make_job(user.id)
+    progress = []
+
+    def get_news(q, topic, sources, **kwargs):
+        if topic == "broken":
+            raise ValueError("Bad topic.")
+        return {"status": "ok", "articles": [news(1 if topic == "tech" else 2)]}
+
+    def get_news_by_topic(on_result, **kwargs):
+        def record(topic, response):
+            on_result(topic, response)
+            progress.append(job.progress)
+
+        return utils.get_news_by_topic(on_result=record, **kwargs)
+
+    monkeypatch.setattr(utils, "get_news", get_news)
+    monkeypatch.setattr(ingestion, "get_news_by_topic", get_news_by_topic)
+
+    ingestion.ingest_articles(job, user.id, ["tech", "science", "broken"], [], ["python"])
+
+    # counted before the feed is written, one topic at a time
+    assert progress == [1, 2, 3]
+    assert (job.progress, job.total) == (3, 3)
+    assert job.message == "Failed topics: broken: Bad topic."
+    assert set(feed(user.id)) == {news(1)["link"], news(2)["link"]}
+
+
+def test_jobs_without_updates_are_reported_failed(app, monkeypatch, make_user, make_job):
+    monkeypatch.setitem(app.config, "JOB_STALE_SECONDS", 60)
+    user = make_user()
+    running, finished = make_job(user.id), make_job(user.id)
+    running.update(status=JobStatus.RUNNING)
+    assert running.to_dict()["status"] == "RUNNING"
+
+    long_ago = datetime.utcnow() - timedelta(minutes=5)
+    running.update(updated_at=long_ago)
+    finished.update(status=JobStatus.FINISHED, updated_at=long_ago)
+
+    assert (running.to_dict()["status"], running.to_dict()["stale"]) == ("FAILED", True)
+    assert running.to_dict()["message"] == "Job stopped responding."
+    assert (finished.to_dict()["status"], finished.to_dict()["stale"]) == ("FINISHED", False)
+
+
+def test_prune_orphans_only_deletes_given_articles(make_user, make_article):
+    user = make_user()
+    kept = make_article([user.id])
+    orphan = make_article(keywords=["python"])
+    untouched = make_article()
+
+    assert Article.prune_orphans([kept.id, orphan.id]) == 1
+    assert {article.id for article in Article.query} == {kept.id, untouched.id}
+    assert ArticleKeyword.query.count() == 0
+
+    assert Article.prune_orphans() == 1
+    assert [article.id for article in Article.query] == [kept.id]
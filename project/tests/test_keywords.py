@@ -0,0 +1,46 @@
+from concurrent.futures import Future
+
+import pytest
+
+from project import processing
+from project.api.keywords import get_keywords_batch, keyword_cache
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    # run extraction batches inline, recording the texts of each one
+    batches = []
+
+    class InlinePool(object):
+        def submit(self, func, texts, max_keywords):
+            batches.append(texts)
+            future = Future()
+            future.set_result(func(texts, max_keywords))
+            return future
+
+    def extract_keywords(texts, max_keywords):
+        return [text.lower().split()[:max_keywords] for text in texts], 0.01
+
+    keyword_cache.clear()
+    monkeypatch.setattr(processing, "get_pool", lambda name: InlinePool())
+    monkeypatch.setattr(processing, "extract_keywords", extract_keywords)
+    yield batches
+    keyword_cache.clear()
+
+
+def test_keywords_are_extracted_once_per_text(app, pool):
+    texts = ["Python Release", "", "Rust news", "Python Release", "  "]
+
+    assert get_keywords_batch(texts, max_keywords=2) == [
+        ["python", "release"], [], ["rust", "news"], ["python", "release"], []]
+    assert pool == [["Python Release", "Rust news"]]
+
+    assert get_keywords_batch(["Rust news", "Go news"], max_keywords=2) == [["rust", "news"], ["go", "news"]]
+    assert pool[1:] == [["Go news"]]
+
+
+def test_keywords_are_cached_per_max_keywords(app, pool):
+    get_keywords_batch(["Python release notes"], max_keywords=2)
+
+    assert get_keywords_batch(["Python release notes"], max_keywords=3) == [["python", "release", "notes"]]
+    assert len(pool) == 2
@@ -0,0 +1,94 @@
+from datetime import datetime
+
+import pytest
+
+from project.models import Article
+from project.api.pagination import encode_cursor, decode_cursor, paginate_feed
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(datetime(2023, 5, 1, 12, 30), 42)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (datetime(2023, 5, 1, 12, 30), 42)
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_feed_pages_cover_every_article_once(make_user, make_article):
+    user = make_user()
+    other = make_user()
+    # several articles share a date, the article id breaks the tie
+    dates = ["2023-05-01 12:00:00"] * 3 + ["2023-05-02 12:00:00"] * 2 + ["2023-04-30 08:00:00"]
+    articles = [make_article([user.id], date=date) for date in dates]
+    make_article([other.id])
+
+    ids, cursor = [], None
+    while True:
+        page = paginate_feed(Article.feed(user.id), limit=2, cursor=cursor)
+        assert page["total"] == len(articles)
+        ids.extend(article.id for article in page["items"])
+
+        if not page["has_next"]:
+            assert page["next_cursor"] is None
+            break
+        cursor = page["next_cursor"]
+
+    expected = sorted(articles, key=lambda article: (article.date, article.id), reverse=True)
+    assert ids == [article.id for article in expected]
+
+
+def test_feed_page_is_stable_when_newer_articles_arrive(make_user, make_article):
+    user = make_user()
+    for _ in range(4):
+        make_article([user.id])
+
+    first = paginate_feed(Article.feed(user.id), limit=2)
+    make_article([user.id], date="2023-06-01 12:00:00")
+    second = paginate_feed(Article.feed(user.id), limit=2, cursor=first["next_cursor"])
+
+    seen = {article.id for article in first["items"]}
+    assert not seen & {article.id for article in second["items"]}
+    assert len(second["items"]) == 2
+
+
+def test_feed_limit_is_validated_and_capped(make_user, make_article):
+    user = make_user()
+    for _ in range(3):
+        make_article([user.id])
+
+    with pytest.raises(ValueError):
+        paginate_feed(Article.feed(user.id), limit=0)
+
+    page = paginate_feed(Article.feed(user.id), limit=50, max_limit=2)
+    assert len(page["items"]) == 2
+    assert page["has_next"]
+
+
+def test_feed_endpoint(client, make_user, make_article, login):
+    user = make_user()
+    for _ in range(3):
+        make_article([user.id])
+    headers = {"Authorization": "Bearer " + login(user)["auth_token"]}
+
+    response = client.get("/article/feed/2", headers=headers)
+    data = response.get_json()
+    assert response.status_code == 200
+    assert len(data["data"]) == 2
+    assert data["total"] == 3
+    assert data["has_next"]
+
+    response = client.get("/article/feed/2?count=false&cursor=" + data["next_cursor"], headers=headers)
+    data = response.get_json()
+    assert len(data["data"]) == 1
+    assert data["total"] is None
+    assert not data["has_next"]
+
+    response = client.get("/article/feed/2?cursor=garbage", headers=headers)
+    assert response.status_code == 400
+
+    response = client.get("/article/feed/-5", headers=headers)
+    assert response.status_code == 400
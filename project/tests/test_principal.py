@@ -0,0 +1,52 @@
+import pytest
+
+from project.models import User
+from project.models.user_model import principal_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_principal_cache():
+    # user ids repeat between tests, every test starts from a fresh database
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+def test_principal_is_served_from_the_cache(make_user):
+    user = make_user()
+
+    assert User.get_principal(user.id) == user.to_principal()
+
+    # changed behind the model's back, the cached principal is still served
+    User.query.filter_by(id=user.id).update({"is_active": False})
+    assert User.get_principal(user.id)["is_active"]
+
+
+def test_suspend_invalidates_the_principal(make_user):
+    user = make_user()
+    assert not User.get_principal(user.id)["is_suspended"]
+
+    user.suspend()
+    assert User.get_principal(user.id)["is_suspended"]
+
+    user.suspend(False)
+    assert not User.get_principal(user.id)["is_suspended"]
+
+
+def test_update_invalidates_the_principal(make_user):
+    user = make_user()
+    User.get_principal(user.id)
+
+    user.update(is_active=False)
+
+    assert not User.get_principal(user.id)["is_active"]
+
+
+def test_delete_invalidates_the_principal(make_user):
+    user = make_user()
+    user_id = user.id
+    User.get_principal(user_id)
+
+    user.delete()
+
+    assert User.get_principal(user_id) is None
@@ -0,0 +1,82 @@
+from project.models import search_articles
+from project.models.search import like_query, to_match_query
+
+
+def test_match_query_quotes_every_word_as_a_prefix():
+    assert to_match_query('python "3.11" AND') == '"python"* "3"* "11"* "AND"*'
+
+
+def test_search_only_returns_articles_of_the_user(make_user, make_article):
+    user = make_user()
+    other = make_user()
+    mine = make_article([user.id], title="Python release notes")
+    make_article([other.id], title="Python conference")
+    make_article([user.id], title="Rust release notes")
+
+    result = search_articles(user.id, "python")
+
+    assert [article.id for article in result["items"]] == [mine.id]
+    assert result["total"] == 1
+
+
+def test_search_ranks_title_matches_first(make_user, make_article):
+    user = make_user()
+    in_summary = make_article([user.id], title="Weekly digest", summary="A new python release is out")
+    in_title = make_article([user.id], title="Python release", summary="Details inside")
+
+    result = search_articles(user.id, "python")
+
+    assert [article.id for article in result["items"]] == [in_title.id, in_summary.id]
+
+
+def test_search_matches_every_word_as_a_prefix(make_user, make_article):
+    user = make_user()
+    both = make_article([user.id], title="Programming languages", summary="Python grows")
+    make_article([user.id], title="Programming jobs")
+
+    result = search_articles(user.id, "program pyth")
+
+    assert [article.id for article in result["items"]] == [both.id]
+
+
+def test_search_pages(make_user, make_article):
+    user = make_user()
+    for _ in range(5):
+        make_article([user.id], title="Python news")
+
+    first = search_articles(user.id, "python", page=1, limit=2)
+    last = search_articles(user.id, "python", page=3, limit=2)
+
+    assert (first["total"], first["pages"], first["has_next"], first["has_prev"]) == (5, 3, True, False)
+    assert (len(last["items"]), last["has_next"], last["has_prev"]) == (1, False, True)
+    # same scores, newest id first, so pages never overlap
+    ids = [article.id for page in (1, 2, 3) for article in search_articles(user.id, "python", page, 2)["items"]]
+    assert ids == sorted(ids, reverse=True)
+
+
+def test_search_without_words_finds_nothing(make_user, make_article):
+    user = make_user()
+    make_article([user.id], title="Python news")
+
+    assert search_articles(user.id, "  ")["items"] == []
+
+
+def test_like_query_escapes_wildcards(make_user, make_article):
+    user = make_user()
+    literal = make_article([user.id], title="snake_case naming")
+    make_article([user.id], title="snakeXcase naming")
+
+    assert [article.id for article in like_query(user.id, "snake_case")] == [literal.id]
+
+
+def test_search_endpoint(client, make_user, make_article, login):
+    user = make_user()
+    article = make_article([user.id], title="Python release")
+    headers = {"Authorization": "Bearer " + login(user)["auth_token"]}
+
+    response = client.get("/article/search/1/10?q=python", headers=headers)
+    assert response.status_code == 200
+    assert [item["id"] for item in response.get_json()["data"]] == [article.id]
+
+    response = client.get("/article/search/1/10", headers=headers)
+    assert response.status_code == 400
@@ -0,0 +1,62 @@
+import io
+import importlib
+
+import pytest
+
+from project.models import Upload
+from project.api.upload import upload
+
+# project.api re-exports the decorator under the module's name
+upload_module = importlib.import_module("project.api.upload")
+
+
+@pytest.fixture
+def imagekit(monkeypatch):
+    # record the files that would have been sent to ImageKit
+    calls = []
+
+    def upload_file(file, filename, filetype):
+        calls.append(filename)
+        return {"url": "https://ik.imagekit.io/{}".format(filename)}
+
+    def upload_renditions(file, filename, sizes):
+        calls.extend("{}@{}".format(filename, size) for size in sizes)
+        return {str(size): "https://ik.imagekit.io/{}_{}".format(size, filename) for size in sizes}
+
+    monkeypatch.setattr(upload_module, "upload_file", upload_file)
+    monkeypatch.setattr(upload_module, "upload_renditions", upload_renditions)
+    return calls
+
+
+def send(app, view, content: bytes, filename: str = "file.png"):
+    data = {"file": (io.BytesIO(content), filename, "image/png")}
+    with app.test_request_context("/", method="POST", data=data):
+        return view()
+
+
+def test_same_content_is_uploaded_once(app, db, imagekit):
+    view = upload(lambda url: url)
+
+    first = send(app, view, b"content", "first.png")
+    second = send(app, view, b"content", "second.png")
+    other = send(app, view, b"other content", "third.png")
+
+    assert first == second == "https://ik.imagekit.io/first.png"
+    assert other == "https://ik.imagekit.io/third.png"
+    assert imagekit == ["first.png", "third.png"]
+    assert Upload.query.count() == 2
+
+
+def test_missing_renditions_are_uploaded_for_known_content(app, db, imagekit):
+    send(app, upload(lambda url: url), b"content", "plain.png")
+
+    view = upload(lambda url, renditions: (url, renditions), renditions=(64, 256), original=False)
+    url, renditions = send(app, view, b"content", "avatar.png")
+
+    assert url == renditions["256"]
+    assert imagekit == ["plain.png", "avatar.png@64", "avatar.png@256"]
+
+    # every size is stored now, nothing is uploaded again
+    assert send(app, view, b"content", "again.png") == (url, renditions)
+    assert len(imagekit) == 3
+    assert Upload.query.one().renditions == renditions